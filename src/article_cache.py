@@ -1,76 +1,111 @@
-import json
 import os
-from typing import List, Dict, Any, Set
-from datetime import datetime
+import sqlite3
+from typing import List
+
+import orjson
+
+from rss_parser import FeedItem, canonicalize_url
+
+
+# Number of URLs per `IN (...)` lookup, well under SQLite's host parameter limit
+LOOKUP_BATCH_SIZE = 500
 
 
 class ArticleCache:
-    """Manages cache of previously posted articles to avoid reposting."""
+    """Manages cache of previously posted articles to avoid reposting.
+
+    Posted URLs live in a SQLite table keyed by canonical URL (see
+    `canonicalize_url`), so marking an article as posted is a single insert
+    and a lookup only touches the URLs being checked, however long the
+    posting history grows.
+    """
 
-    def __init__(self, cache_file: str = "cache/posted_articles.json"):
+    def __init__(self, cache_file: str = "cache/posted_articles.sqlite"):
+        if cache_file.endswith('.json'):
+            # Older configs point at the JSON snapshot; keep it for migration and store next to it
+            cache_file = os.path.splitext(cache_file)[0] + '.sqlite'
         self.cache_file = cache_file
-        self.posted_urls: Set[str] = set()
-        self._load_cache()
-
-    def _load_cache(self):
-        """Load posted article URLs from cache file."""
-        if os.path.exists(self.cache_file):
-            try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.posted_urls = set(data.get('posted_urls', []))
-            except Exception as e:
-                print(f"Warning: Could not load article cache: {e}")
-                self.posted_urls = set()
-        else:
-            # Create cache directory if it doesn't exist
-            cache_dir = os.path.dirname(self.cache_file)
-            if cache_dir and not os.path.exists(cache_dir):
-                os.makedirs(cache_dir, exist_ok=True)
-
-    def _save_cache(self):
-        """Save posted article URLs to cache file."""
+
+        # Create cache directory if it doesn't exist
+        cache_dir = os.path.dirname(self.cache_file)
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self.conn = sqlite3.connect(self.cache_file, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS posted (url_canon TEXT PRIMARY KEY) WITHOUT ROWID')
+        self._migrate_legacy_cache()
+
+    def _migrate_legacy_cache(self):
+        """Import URLs from the old JSON snapshot and log into an empty database."""
+        legacy_file = os.path.splitext(self.cache_file)[0] + '.json'
+        legacy_log_file = f"{legacy_file}.log"
+        if self.get_cache_size() or not os.path.exists(legacy_file):
+            return
+
+        urls = set()
         try:
-            cache_dir = os.path.dirname(self.cache_file)
-            if cache_dir and not os.path.exists(cache_dir):
-                os.makedirs(cache_dir, exist_ok=True)
-
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'posted_urls': list(self.posted_urls),
-                    'last_updated': datetime.now().isoformat()
-                }, f, indent=2)
+            with open(legacy_file, 'rb') as f:
+                urls.update(orjson.loads(f.read()).get('posted_urls', []))
+            if os.path.exists(legacy_log_file):
+                with open(legacy_log_file, 'r', encoding='utf-8') as f:
+                    urls.update(line.strip() for line in f if line.strip())
         except Exception as e:
-            print(f"Warning: Could not save article cache: {e}")
+            print(f"Warning: Could not migrate legacy article cache: {e}")
+            return
+
+        self.mark_batch_as_posted(list(urls))
+        print(f"Migrated {len(urls)} posted articles from {legacy_file}")
 
     def is_posted(self, url: str) -> bool:
         """Check if an article URL has been posted before."""
-        return url in self.posted_urls
+        row = self.conn.execute('SELECT 1 FROM posted WHERE url_canon = ?', (canonicalize_url(url),)).fetchone()
+        return row is not None
 
     def mark_as_posted(self, url: str):
         """Mark an article URL as posted."""
-        self.posted_urls.add(url)
-        self._save_cache()
-
-    def mark_batch_as_posted(self, urls: List[str]):
-        """Mark multiple article URLs as posted."""
-        self.posted_urls.update(urls)
-        self._save_cache()
-
-    def filter_unposted(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Filter out articles that have been posted before."""
-        unposted = []
-        for item in items:
-            url = item.get('link', '')
-            if url and not self.is_posted(url):
-                unposted.append(item)
-        return unposted
+        self.mark_batch_as_posted([url])
+
+    def mark_batch_as_posted(self, urls: List[str], canonical: bool = False):
+        """Mark multiple article URLs as posted; pass `canonical=True` if they are already canonicalized."""
+        canonical_urls = urls if canonical else [canonicalize_url(url) for url in urls]
+        try:
+            self.conn.execute('BEGIN')
+            self.conn.executemany('INSERT OR IGNORE INTO posted (url_canon) VALUES (?)',
+                                  [(url,) for url in canonical_urls])
+            self.conn.execute('COMMIT')
+        except Exception as e:
+            if self.conn.in_transaction:
+                self.conn.execute('ROLLBACK')
+            print(f"Warning: Could not save article cache: {e}")
+
+    def filter_unposted(self, items: List[FeedItem]) -> List[FeedItem]:
+        """Filter out articles that have been posted before, using each item's `link_canon`."""
+        if self.conn.execute('SELECT 1 FROM posted LIMIT 1').fetchone() is None:
+            # Nothing posted yet; only items without a link are dropped
+            return [item for item in items if item.link_canon]
+
+        candidates = [item.link_canon for item in items if item.link_canon]
+
+        posted = set()
+        for i in range(0, len(candidates), LOOKUP_BATCH_SIZE):
+            batch = candidates[i:i + LOOKUP_BATCH_SIZE]
+            placeholders = ','.join('?' * len(batch))
+            posted.update(
+                row[0] for row in
+                self.conn.execute(f'SELECT url_canon FROM posted WHERE url_canon IN ({placeholders})', batch)
+            )
+
+        return [item for item in items if (url := item.link_canon) and url not in posted]
 
     def get_cache_size(self) -> int:
         """Get the number of cached article URLs."""
-        return len(self.posted_urls)
+        return self.conn.execute('SELECT COUNT(*) FROM posted').fetchone()[0]
 
     def clear_cache(self):
         """Clear all cached article URLs."""
-        self.posted_urls = set()
-        self._save_cache()
+        self.conn.execute('DELETE FROM posted')
+
+    def close(self):
+        """Close the database, folding the write-ahead log back into the main file."""
+        self.conn.close()
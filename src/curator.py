@@ -1,25 +1,71 @@
 import asyncio
 import hashlib
-import json
+from dataclasses import replace
 from typing import List, Dict, Any
 
 import numpy as np
-from openai import OpenAI
-from anthropic import Anthropic
-from tqdm import tqdm
+import orjson
+from aiolimiter import AsyncLimiter
+from openai import AsyncOpenAI
 from diskcache import Cache
 
+from embedding_store import EmbeddingStore
+from rss_parser import FeedItem
+
+
+EMBEDDING_BATCH_SIZE = 256
+EMBEDDING_DTYPE = np.float32
+EMBEDDING_MAX_CONCURRENT_REQUESTS = 8
+EMBEDDING_TOKENS_PER_MINUTE = 1_000_000
+EMBEDDING_CACHE_KEY_VERSION = "v2"
+SELECTION_DESCRIPTION_CHARS = 200
+# Output budget per shortlist entry for the selection response (index, flag and one-sentence explanation)
+SELECTION_TOKENS_PER_ITEM = 64
+# Tool the selection model must call, so decisions come back as structured input rather than JSON in free text
+RECORD_SELECTIONS_TOOL = {
+    'name': 'record_selections',
+    'description': 'Record the selection decision for every article in the shortlist.',
+    'input_schema': {
+        'type': 'object',
+        'properties': {
+            'selections': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'index': {'type': 'integer', 'description': "The article's index in the shortlist"},
+                        'selected': {'type': 'boolean'},
+                        'explanation': {
+                            'type': 'string',
+                            'description': 'Rationale for selection/rejection (one sentence)'
+                        }
+                    },
+                    'required': ['index', 'selected', 'explanation']
+                }
+            }
+        },
+        'required': ['selections']
+    }
+}
+
 
 class ContentCurator:
-    def __init__(self, openai_api_key: str, anthropic_api_key: str = None, cache_dir: str = "cache/embeddings"):
-        self.client = OpenAI(api_key=openai_api_key)
-        self.anthropic_client = Anthropic(api_key=anthropic_api_key) if anthropic_api_key else None
-        self.embedding_model = "text-embedding-3-large"
+    def __init__(self, openai_api_key: str, anthropic_api_key: str = None, cache_dir: str = "cache/embeddings",
+                 embedding_dimensions: int = 512):
+        self.client = AsyncOpenAI(api_key=openai_api_key)
+        self.anthropic_api_key = anthropic_api_key
+        # Created on first use; importing anthropic is slow and many runs exit before selection
+        self.anthropic_client = None
+        self.embedding_model = "text-embedding-3-small"
+        self.embedding_dimensions = embedding_dimensions
+        self.store = EmbeddingStore(cache_dir, embedding_dimensions)
         self.cache = Cache(cache_dir)
         self.cache_hits = 0
         self.cache_misses = 0
+        self._request_semaphore = asyncio.Semaphore(EMBEDDING_MAX_CONCURRENT_REQUESTS)
+        self._token_limiter = AsyncLimiter(EMBEDDING_TOKENS_PER_MINUTE, 60)
 
-    async def load_topics(self, topics_file: str = 'topics.txt') -> List[str]:
+    def load_topics(self, topics_file: str = 'topics.txt') -> List[str]:
         """Load topics from a text file."""
         with open(topics_file, 'r', encoding='utf-8') as f:
             content = f.read()
@@ -31,78 +77,113 @@ class ContentCurator:
         ]
 
     def _get_cache_key(self, text: str) -> str:
-        """Generate cache key from text and model."""
-        text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
-        return f"{self.embedding_model}:{text_hash}"
+        """Generate cache key from text, model, dimensions and storage dtype."""
+        # Non-adversarial lookup key: 64-bit BLAKE2b is plenty and much cheaper than SHA-256 on short strings
+        text_hash = hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+        return f"{EMBEDDING_CACHE_KEY_VERSION}:{self.embedding_model}:{self.embedding_dimensions}:{np.dtype(EMBEDDING_DTYPE).name}:{text_hash}"
+
+    async def embed_texts(self, texts: List[str]) -> List[np.ndarray]:
+        """Normalized embeddings of arbitrary texts, cached in the same store as title embeddings."""
+        return await self._get_embeddings_batch(texts)
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        """L2-normalize an embedding so cosine similarity reduces to a dot product."""
+        vec = np.asarray(embedding, dtype=EMBEDDING_DTYPE)
+        norm = np.linalg.norm(vec)
+        if norm == 0:
+            return vec
+        return vec / norm
+
+    def _get_cached_batch(self, texts: List[str]) -> tuple[Dict[int, np.ndarray], List[int]]:
+        """Look up many texts in the embedding store."""
+        hits: Dict[int, np.ndarray] = {}
+        misses: List[int] = []
+        for idx, text in enumerate(texts):
+            cached_embedding = self.store.get(self._get_cache_key(text))
+            if cached_embedding is not None:
+                hits[idx] = cached_embedding
+            else:
+                misses.append(idx)
+        return hits, misses
+
+    async def _embed_chunk(self, texts: List[str]) -> List[np.ndarray]:
+        """Call the embeddings endpoint for one batch, bounded by the request and token limits."""
+        # Rough token estimate (~4 characters per token) for the per-minute token budget
+        estimated_tokens = min(sum(len(text) // 4 + 1 for text in texts), EMBEDDING_TOKENS_PER_MINUTE)
+        async with self._request_semaphore:
+            await self._token_limiter.acquire(estimated_tokens)
+            response = await self.client.embeddings.create(
+                model=self.embedding_model,
+                input=texts,
+                dimensions=self.embedding_dimensions
+            )
+        return [self._normalize(data.embedding) for data in response.data]
 
-    def get_embedding(self, text: str) -> List[float]:
-        """Get OpenAI embedding for a text string, with caching."""
-        cache_key = self._get_cache_key(text)
+    async def _get_embeddings_batch(self, texts: List[str]) -> List[np.ndarray]:
+        """Get OpenAI embeddings for many texts, batching cache misses into few concurrent API calls."""
+        embeddings: List[np.ndarray] = [None] * len(texts)
 
         # Check cache first
-        cached_embedding = self.cache.get(cache_key)
-        if cached_embedding is not None:
-            self.cache_hits += 1
-            return cached_embedding
-
-        # Cache miss - call API
-        self.cache_misses += 1
-        response = self.client.embeddings.create(
-            model=self.embedding_model,
-            input=text
+        hits, misses = self._get_cached_batch(texts)
+        for idx, cached_embedding in hits.items():
+            embeddings[idx] = cached_embedding
+        self.cache_hits += len(hits)
+
+        # Cache misses - one API call per batch of inputs, several batches in flight at once
+        self.cache_misses += len(misses)
+        chunks = [misses[start:start + EMBEDDING_BATCH_SIZE] for start in range(0, len(misses), EMBEDDING_BATCH_SIZE)]
+        results = await asyncio.gather(
+            *[self._embed_chunk([texts[idx] for idx in chunk]) for chunk in chunks]
         )
-        embedding = response.data[0].embedding
-
-        # Store in cache
-        self.cache.set(cache_key, embedding, expire=None)  # Never expire
-
-        return embedding
-
-    async def get_embedding_async(self, text: str) -> List[float]:
-        """Get OpenAI embedding asynchronously."""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.get_embedding, text)
+        for chunk, chunk_embeddings in zip(chunks, results):
+            for idx, embedding in zip(chunk, chunk_embeddings):
+                embeddings[idx] = embedding
+
+        # Store fresh embeddings, then persist rows and index once
+        if misses:
+            for idx in misses:
+                self.store.set(self._get_cache_key(texts[idx]), embeddings[idx])
+            self.store.flush()
+
+        return embeddings
+
+    def _get_topic_matrix_key(self, topics: List[str]) -> str:
+        """Generate cache key for the stacked embeddings of a topic list."""
+        topics_hash = hashlib.sha256(
+            ("|".join(sorted(topics)) + ":" + self.embedding_model + ":" + str(self.embedding_dimensions)).encode('utf-8')
+        ).hexdigest()
+        return f"topic_matrix:{np.dtype(EMBEDDING_DTYPE).name}:{topics_hash}"
+
+    async def _get_topic_matrix(self, topics: List[str]) -> np.ndarray:
+        """Get the (T, D) matrix of normalized topic embeddings, cached across runs."""
+        sorted_topics = sorted(topics)
+        cache_key = self._get_topic_matrix_key(topics)
+
+        buf = self.cache.get(cache_key)
+        if buf is not None:
+            self.cache_hits += len(sorted_topics)
+            return np.frombuffer(buf, dtype=EMBEDDING_DTYPE).reshape(len(sorted_topics), -1)
+
+        topic_matrix = np.stack(await self._get_embeddings_batch(sorted_topics))
+        self.cache.set(cache_key, topic_matrix.tobytes(), expire=None)  # Never expire
+        return topic_matrix
 
     def cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
         """Calculate cosine similarity between two vectors."""
-        vec1_np = np.array(vec1)
-        vec2_np = np.array(vec2)
-
-        dot_product = np.dot(vec1_np, vec2_np)
-        norm1 = np.linalg.norm(vec1_np)
-        norm2 = np.linalg.norm(vec2_np)
-
-        if norm1 == 0 or norm2 == 0:
+        denom = np.sqrt(np.vdot(vec1, vec1) * np.vdot(vec2, vec2))
+        if denom == 0:
             return 0.0
 
-        return float(dot_product / (norm1 * norm2))
-
-    async def calculate_relevance_score(self, item: Dict[str, Any], topic_embeddings: List[tuple[str, List[float]]]) -> float:
-        """Calculate relevance score using semantic similarity."""
-        # Get item text (title is most important)
-        item_text = item.get('title', '')
-        if not item_text:
-            return 0.0
-
-        # Get embedding for the item (cached)
-        item_embedding = await self.get_embedding_async(item_text)
-
-        # Calculate maximum similarity to any topic
-        max_similarity = 0.0
-        for topic, topic_embedding in topic_embeddings:
-            similarity = self.cosine_similarity(item_embedding, topic_embedding)
-            max_similarity = max(max_similarity, similarity)
-
-        # Convert similarity (0-1) to a score (0-100)
-        return max_similarity * 100
+        return float(np.dot(vec1, vec2) / denom)
 
     async def curate_items(
         self,
-        items: List[Dict[str, Any]],
+        items: List[FeedItem],
         topics: List[str],
         min_score: float = 0.1,
         max_items_to_post: int = None
-    ) -> List[Dict[str, Any]]:
+    ) -> List[FeedItem]:
         """Curate items by scoring based on semantic similarity to topics."""
         if not topics:
             return []
@@ -111,66 +192,71 @@ class ContentCurator:
         self.cache_hits = 0
         self.cache_misses = 0
 
-        # Get embeddings for all topics (cached)
-        print(f"Getting embeddings for {len(topics)} topics...")
-        topic_embeddings = []
-        for topic in topics:
-            embedding = await self.get_embedding_async(topic)
-            topic_embeddings.append((topic, embedding))
-
-        print(f"Topic embeddings: {self.cache_hits} cached, {self.cache_misses} new")
+        # Group items by title (title is most important). Cross-posted items often
+        # share a title, so each distinct title is embedded once.
+        title_to_items: Dict[str, List[int]] = {}
+        for idx, item in enumerate(items):
+            title = item.title
+            if title:
+                title_to_items.setdefault(title, []).append(idx)
+
+        # Fetch the normalized topic matrix and the title embeddings concurrently
+        print(f"Getting embeddings for {len(topics)} topics and {len(title_to_items)} distinct titles...")
+        topic_matrix, embedded = await asyncio.gather(
+            self._get_topic_matrix(topics),
+            self._get_embeddings_batch(list(title_to_items))
+        )
+        print(f"Embeddings: {self.cache_hits} cached, {self.cache_misses} new")
 
-        # Reset for article embeddings
-        article_cache_hits = self.cache_hits
-        article_cache_misses = self.cache_misses
+        # Stack the (normalized) embeddings; items without a title keep a zero row and score 0
+        item_matrix = np.zeros((len(items), topic_matrix.shape[1]), dtype=EMBEDDING_DTYPE)
+        for indices, embedding in zip(title_to_items.values(), embedded):
+            item_matrix[indices] = embedding
 
-        # Calculate relevance scores for all items
+        # Maximum similarity to any topic in a single matmul, converted from (0-1) to a score (0-100)
         print(f"Calculating relevance scores for {len(items)} items...")
-        scored_items = []
-        for item in tqdm(items, desc="Scoring items"):
-            item_copy = item.copy()
-            score = await self.calculate_relevance_score(item, topic_embeddings)
-            item_copy['relevanceScore'] = score
-            scored_items.append(item_copy)
-            print(f"Item: {item.get('title', 'No title')}, Score: {score:.2f}")
-
-        article_cache_hits = self.cache_hits - article_cache_hits
-        article_cache_misses = self.cache_misses - article_cache_misses
-        print(f"Article embeddings: {article_cache_hits} cached, {article_cache_misses} new")
+        scores = np.clip((item_matrix @ topic_matrix.T).max(axis=1), 0.0, None) * 100
+
+        scored_items = [replace(item, relevanceScore=score) for item, score in zip(items, scores.tolist())]
+
         print(f"Total API calls saved: {self.cache_hits}")
 
         # Filter by minimum score
         filtered_items = [
             item for item in scored_items
-            if item['relevanceScore'] >= min_score
+            if item.relevanceScore >= min_score
         ]
 
         # Sort by relevance score (highest first)
-        filtered_items.sort(key=lambda x: x['relevanceScore'], reverse=True)
+        filtered_items.sort(key=lambda x: x.relevanceScore, reverse=True)
 
         # Limit to max_items_to_post if specified
         if max_items_to_post and len(filtered_items) > max_items_to_post:
             filtered_items = filtered_items[:max_items_to_post]
 
+        # One summary table instead of a line per scored item
+        for item in filtered_items:
+            print(f"  {item.relevanceScore:6.2f}  {item.title}")
+
         return filtered_items
 
-    def group_by_relevance(self, curated_items: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    def group_by_relevance(self, curated_items: List[FeedItem]) -> Dict[str, List[FeedItem]]:
         """Group items by relevance level (high, medium, low)."""
-        # Using semantic similarity scores (0-100)
-        high_relevance = [item for item in curated_items if item['relevanceScore'] >= 70]
-        medium_relevance = [item for item in curated_items if 40 <= item['relevanceScore'] < 70]
-        low_relevance = [item for item in curated_items if item['relevanceScore'] < 40]
+        # Using semantic similarity scores (0-100): <40 low, 40-70 medium, >=70 high
+        scores = np.fromiter((item.relevanceScore for item in curated_items), dtype=np.float64, count=len(curated_items))
+        buckets = np.digitize(scores, [40.0, 70.0])
 
-        return {
-            'high': high_relevance,
-            'medium': medium_relevance,
-            'low': low_relevance
-        }
+        groups = {'high': [], 'medium': [], 'low': []}
+        keys = ('low', 'medium', 'high')
+        for item, bucket in zip(curated_items, buckets.tolist()):
+            groups[keys[bucket]].append(item)
+
+        return groups
 
     def get_cache_stats(self) -> Dict[str, Any]:
         """Get cache statistics."""
         return {
-            'size': len(self.cache),
+            'size': len(self.store),
             'hits': self.cache_hits,
             'misses': self.cache_misses,
             'hit_rate': self.cache_hits / (self.cache_hits + self.cache_misses) if (self.cache_hits + self.cache_misses) > 0 else 0
@@ -178,15 +264,20 @@ class ContentCurator:
 
     async def llm_select_items(
         self,
-        shortlist: List[Dict[str, Any]],
+        shortlist: List[FeedItem],
         topics: List[str],
         guidance_prompt: str,
         max_items: int,
         model: str = "claude-sonnet-4-5-20250929"
-    ) -> List[Dict[str, Any]]:
+    ) -> List[FeedItem]:
         """Use an LLM to select the best items from a shortlist based on topics and guidance."""
-        if not self.anthropic_client:
+        if not self.anthropic_api_key:
             raise ValueError("Anthropic client not initialized. Please provide anthropic_api_key.")
+        if self.anthropic_client is None:
+            from anthropic import AsyncAnthropic
+            from summarizer import shared_anthropic_http_client
+            self.anthropic_client = AsyncAnthropic(api_key=self.anthropic_api_key,
+                                                   http_client=shared_anthropic_http_client())
 
         if not shortlist:
             return []
@@ -199,11 +290,11 @@ class ContentCurator:
         for idx, item in enumerate(shortlist):
             items_summary.append({
                 'index': idx,
-                'title': item.get('title', 'No title'),
-                'source': item.get('feedSource', 'Unknown source'),
-                'relevance_score': item.get('relevanceScore', 0),
-                'creator': item.get('creator', 'Unknown'),
-                'description': (item.get('description') or item.get('content') or '')[:500]  # Truncate long descriptions
+                'title': item.title,
+                'source': item.feedSource,
+                'relevance_score': round(item.relevanceScore or 0, 1),
+                'creator': item.creator or 'Unknown',
+                'description': (item.description or item.content or '')[:SELECTION_DESCRIPTION_CHARS]  # Truncate long descriptions
             })
 
         # Create the selection prompt
@@ -217,46 +308,31 @@ Selection guidance:
 
 Here are the {len(shortlist)} articles in the shortlist (with their embedding-based relevance scores):
 
-{json.dumps(items_summary, indent=2)}
+{orjson.dumps(items_summary).decode('utf-8')}
 
 Please select the top {max_items} articles that best match the topics and guidance.
 
-Respond with ONLY a JSON array containing ALL articles with the following format:
-[
-  {{"index": 0, "selected": true, "explanation": "rationale for selection/rejection (one sentence)"}},
-  {{"index": 1, "selected": false, "explanation": "rationale for selection/rejection (one sentence)"}},
-  ...
-]"""
-
-        # Call the LLM
-        loop = asyncio.get_event_loop()
-        message = await loop.run_in_executor(
-            None,
-            lambda: self.anthropic_client.messages.create(
-                model=model,
-                max_tokens=5000,
-                messages=[{
-                    'role': 'user',
-                    'content': prompt
-                }]
-            )
+Record a decision for ALL articles with the {RECORD_SELECTIONS_TOOL['name']} tool."""
+
+        # Call the LLM, forcing the tool call
+        message = await self.anthropic_client.messages.create(
+            model=model,
+            max_tokens=max(256, SELECTION_TOKENS_PER_ITEM * len(shortlist)),
+            tools=[RECORD_SELECTIONS_TOOL],
+            tool_choice={'type': 'tool', 'name': RECORD_SELECTIONS_TOOL['name']},
+            messages=[{
+                'role': 'user',
+                'content': prompt
+            }]
         )
 
-        # Parse the response
-        response_text = message.content[0].text.strip()
-
-        # Extract JSON from response (handle cases where LLM adds extra text)
-        # Try to find JSON array in the response
-        start_idx = response_text.find('[')
-        end_idx = response_text.rfind(']') + 1
-        if start_idx != -1 and end_idx > start_idx:
-            json_str = response_text[start_idx:end_idx]
-            selection_results = json.loads(json_str)
-        else:
-            selection_results = json.loads(response_text)
+        selection_results = next(
+            (block.input.get('selections', []) for block in message.content if block.type == 'tool_use'), []
+        )
 
         # Extract selected items and attach explanations
         selected_items = []
+        selected_indices: set[int] = set()
         for result in selection_results:
             if not isinstance(result, dict):
                 continue
@@ -265,13 +341,15 @@ Respond with ONLY a JSON array containing ALL articles with the following format
             is_selected = result.get('selected', False)
             explanation = result.get('explanation', '')
 
+            if not isinstance(idx, int) or not 0 <= idx < len(shortlist):
+                continue
+
             original_item = shortlist[idx]
-            print(f"{original_item.get('title')} selected: {is_selected}, explanation: {explanation}")
+            print(f"{original_item.title} selected: {is_selected}, explanation: {explanation}")
 
-            if is_selected and isinstance(idx, int) and 0 <= idx < len(shortlist):
-                item = shortlist[idx].copy()
-                item['selection_explanation'] = explanation
-                selected_items.append(item)
+            if is_selected and idx not in selected_indices:
+                selected_items.append(replace(original_item, selection_explanation=explanation))
+                selected_indices.add(idx)
 
             if len(selected_items) >= max_items:
                 break
@@ -279,9 +357,10 @@ Respond with ONLY a JSON array containing ALL articles with the following format
         # If we didn't get enough valid selections, fill with remaining top items
         if len(selected_items) < max_items:
             print(f"⚠️  LLM selected {len(selected_items)}/{max_items} items. Filling with top embedding scores.")
-            for item in shortlist:
-                if item not in selected_items:
+            for idx, item in enumerate(shortlist):
+                if idx not in selected_indices:
                     selected_items.append(item)
+                    selected_indices.add(idx)
                 if len(selected_items) >= max_items:
                     break
 
@@ -0,0 +1,91 @@
+import os
+from typing import Dict, Optional
+
+import numpy as np
+import orjson
+
+
+class EmbeddingStore:
+    """Fixed-width float32 vectors in a memory-mapped file, looked up by key.
+
+    Rows are appended to `vectors-<dim>.f32`; `index-<dim>.json` maps each key
+    to its row. A lookup is a dict access plus a view into the mapped file.
+    """
+
+    def __init__(self, store_dir: str, dim: int, initial_capacity: int = 1024):
+        self.dim = dim
+        self.matrix_file = os.path.join(store_dir, f"vectors-{dim}.f32")
+        self.index_file = os.path.join(store_dir, f"index-{dim}.json")
+        self.index: Dict[str, int] = {}
+        self.size = 0
+        self._dirty = False
+
+        os.makedirs(store_dir, exist_ok=True)
+        self._load_index()
+
+        capacity = initial_capacity
+        if os.path.exists(self.matrix_file):
+            capacity = max(capacity, os.path.getsize(self.matrix_file) // self._row_bytes())
+        while capacity < self.size:
+            capacity *= 2
+        self._open_matrix(capacity)
+
+    def _row_bytes(self) -> int:
+        return self.dim * np.dtype(np.float32).itemsize
+
+    def _load_index(self):
+        """Load the key -> row index."""
+        if not os.path.exists(self.index_file):
+            return
+        try:
+            with open(self.index_file, 'rb') as f:
+                data = orjson.loads(f.read())
+            self.index = data.get('index', {})
+            self.size = data.get('size', len(self.index))
+        except Exception as e:
+            print(f"Warning: Could not load embedding index: {e}")
+            self.index = {}
+            self.size = 0
+
+    def _open_matrix(self, capacity: int):
+        """Map the vector file with room for `capacity` rows, growing the file if needed."""
+        required_bytes = capacity * self._row_bytes()
+        if not os.path.exists(self.matrix_file) or os.path.getsize(self.matrix_file) < required_bytes:
+            with open(self.matrix_file, 'ab') as f:
+                f.truncate(required_bytes)
+        self.capacity = capacity
+        self.matrix = np.memmap(self.matrix_file, dtype=np.float32, mode='r+', shape=(capacity, self.dim))
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Return the stored vector for a key (a view into the mapped file), or None."""
+        row = self.index.get(key)
+        if row is None:
+            return None
+        return self.matrix[row]
+
+    def set(self, key: str, vector: np.ndarray):
+        """Store a vector under a key, appending a new row unless the key already exists."""
+        row = self.index.get(key)
+        if row is None:
+            if self.size == self.capacity:
+                self.matrix.flush()
+                self._open_matrix(self.capacity * 2)
+            row = self.size
+            self.index[key] = row
+            self.size += 1
+        self.matrix[row] = vector
+        self._dirty = True
+
+    def flush(self):
+        """Write pending rows and the index to disk."""
+        if not self._dirty:
+            return
+        self.matrix.flush()
+        tmp_file = f"{self.index_file}.tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(orjson.dumps({'size': self.size, 'index': self.index}))
+        os.replace(tmp_file, self.index_file)
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return self.size
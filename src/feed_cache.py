@@ -0,0 +1,78 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+from typing import Dict, Any, Optional
+
+
+# Bump when the shape of cached parse results changes; older caches are discarded
+FEED_CACHE_SCHEMA_VERSION = 4
+
+
+class FeedHTTPCache:
+    """Remembers HTTP validators and parsed results per feed so unchanged feeds are not re-parsed."""
+
+    def __init__(self, cache_file: str = "cache/feeds.sqlite"):
+        self.cache_file = cache_file
+
+        # Create cache directory if it doesn't exist
+        cache_dir = os.path.dirname(self.cache_file)
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self.conn = sqlite3.connect(self.cache_file)
+        if self.conn.execute('PRAGMA user_version').fetchone()[0] != FEED_CACHE_SCHEMA_VERSION:
+            self.conn.execute('DROP TABLE IF EXISTS feeds')
+            self.conn.execute(f'PRAGMA user_version = {FEED_CACHE_SCHEMA_VERSION}')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS feeds ('
+            'url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body_sha256 BLOB, cached_entries BLOB)'
+        )
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Get If-None-Match / If-Modified-Since headers for a previously fetched feed."""
+        row = self.conn.execute(
+            'SELECT etag, last_modified FROM feeds WHERE url = ? AND cached_entries IS NOT NULL', (url,)
+        ).fetchone()
+        headers = {}
+        if row:
+            etag, last_modified = row
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def get_result(self, url: str, body: bytes = None) -> Optional[Dict[str, Any]]:
+        """Get the cached parse result for a feed.
+
+        When `body` is given, the result is only returned if the body is byte-identical
+        to the one it was parsed from (for servers that ignore conditional requests).
+        """
+        row = self.conn.execute('SELECT body_sha256, cached_entries FROM feeds WHERE url = ?', (url,)).fetchone()
+        if not row or row[1] is None:
+            return None
+        body_sha256, cached_entries = row
+        if body is not None and hashlib.sha256(body).digest() != body_sha256:
+            return None
+        try:
+            return pickle.loads(cached_entries)
+        except Exception as e:
+            print(f"Warning: Could not load cached feed {url}: {e}")
+            return None
+
+    def store(self, url: str, etag: Optional[str], last_modified: Optional[str], body: bytes, result: Dict[str, Any]):
+        """Record the validators, body hash and parse result of a freshly downloaded feed."""
+        self.conn.execute(
+            'INSERT OR REPLACE INTO feeds (url, etag, last_modified, body_sha256, cached_entries) VALUES (?, ?, ?, ?, ?)',
+            (url, etag, last_modified, hashlib.sha256(body).digest(), pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        )
+
+    def commit(self):
+        """Persist pending updates."""
+        self.conn.commit()
+
+    def close(self):
+        """Commit and close the database."""
+        self.conn.commit()
+        self.conn.close()
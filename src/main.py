@@ -1,178 +1,20 @@
 #!/usr/bin/env python3
 
-import os
-import sys
-import json
 import asyncio
-import traceback
-from rss_parser import RSSFeedParser
-from curator import ContentCurator
-from summarizer import ClaudeSummarizer
-from slack_poster import SlackPoster
-from article_cache import ArticleCache
+
+from pipeline import load_config, run
 
 
 async def main():
     print('🤖 WellRead Bot Starting...')
-
-    # Load environment variables
-    ANTHROPIC_API_KEY = os.environ.get('ANTHROPIC_API_KEY')
-    OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
-    SLACK_TOKEN = os.environ.get('SLACK_BOT_TOKEN')
-    SLACK_CHANNEL = os.environ.get('SLACK_CHANNEL')
-    SLACK_WEBHOOK = os.environ.get('SLACK_WEBHOOK')
-
-    if not ANTHROPIC_API_KEY:
-        print('❌ ANTHROPIC_API_KEY environment variable is required')
-        sys.exit(1)
-
-    if not OPENAI_API_KEY:
-        print('❌ OPENAI_API_KEY environment variable is required')
-        sys.exit(1)
-
-    if not SLACK_TOKEN or not SLACK_CHANNEL:
-        print('❌ SLACK_BOT_TOKEN and SLACK_CHANNEL environment variables are required')
-        sys.exit(1)
-
-    # Load configuration
-    with open('config.json', 'r') as f:
-        config = json.load(f)
-
-    TIMEFRAME_HOURS = config['timeframe_hours']
-    MAX_ITEMS_TO_POST = config['max_items_to_post']
-    MIN_RELEVANCE_SCORE = config['min_relevance_score']
-    EMBEDDING_CACHE_DIR = config['embedding_cache_dir']
-    SHORTLIST_MULTIPLIER = config['shortlist_multiplier']
-    SELECTION_GUIDANCE_PROMPT = config['selection_guidance_prompt']
-
-    # Article cache configuration
-    CACHE_POSTED_ARTICLES = config['cache_posted_articles']
-    POSTED_ARTICLES_CACHE_FILE = config['posted_articles_cache_file']
-
-    # Get LLM model configurations
-    llm_models = config.get('llm_models', {})
-    SUMMARIZATION_MODEL = llm_models['summarization']
-    SELECTION_MODEL = llm_models.get('selection', SUMMARIZATION_MODEL)
-
-    print(f'⏰ Looking for posts from the last {TIMEFRAME_HOURS} hours')
-    print(f'📊 Maximum items to post: {MAX_ITEMS_TO_POST}')
-    print(f'🤖 Using model: {SUMMARIZATION_MODEL}')
-    if CACHE_POSTED_ARTICLES:
-        print(f'💾 Article cache enabled')
-
-    # Initialize components
-    feed_parser = RSSFeedParser()
-    curator = ContentCurator(OPENAI_API_KEY, anthropic_api_key=ANTHROPIC_API_KEY, cache_dir=EMBEDDING_CACHE_DIR)
-
-    # Initialize article cache if enabled
-    article_cache = None
-    if CACHE_POSTED_ARTICLES:
-        article_cache = ArticleCache(POSTED_ARTICLES_CACHE_FILE)
-        print(f'📚 Loaded article cache with {article_cache.get_cache_size()} previously posted articles')
-
-    try:
-        # Step 1: Load feeds and topics
-        print('📡 Loading RSS feeds...')
-        feed_urls = await feed_parser.load_feeds('feeds.txt')
-        print(f'Found {len(feed_urls)} feeds to monitor')
-
-        print('🎯 Loading topics of interest...')
-        topics = await curator.load_topics('topics.txt')
-        print(f'Loaded {len(topics)} topics')
-
-        if len(feed_urls) == 0:
-            print('❌ No feeds configured in feeds.txt')
-            sys.exit(1)
-
-        if len(topics) == 0:
-            print('❌ No topics configured in topics.txt')
-            sys.exit(1)
-
-        # Step 2: Fetch all RSS feeds
-        print('🔍 Fetching RSS feeds...')
-        all_items = await feed_parser.fetch_all_feeds(feed_urls)
-        print(f'Fetched {len(all_items)} total items')
-
-        # Step 3: Deduplicate by link URL
-        print('🔗 Deduplicating items by link URL...')
-        deduplicated_items = feed_parser.deduplicate_items(all_items)
-        duplicates_removed = len(all_items) - len(deduplicated_items)
-        print(f'{len(deduplicated_items)} unique items ({duplicates_removed} duplicates removed)')
-
-        # Step 4: Filter by timeframe
-        print(f'⏱️  Filtering items from last {TIMEFRAME_HOURS} hours...')
-        recent_items = feed_parser.filter_by_timeframe(deduplicated_items, TIMEFRAME_HOURS)
-        print(f'Found {len(recent_items)} recent items')
-
-        if len(recent_items) == 0:
-            print('✅ No new items to report')
-            sys.exit(0)
-
-        # Step 5: Filter out previously posted articles (if cache enabled)
-        if article_cache:
-            print('🔍 Filtering out previously posted articles...')
-            unposted_items = article_cache.filter_unposted(recent_items)
-            already_posted = len(recent_items) - len(unposted_items)
-            print(f'{len(unposted_items)} unposted items ({already_posted} already posted)')
-            recent_items = unposted_items
-
-            if len(recent_items) == 0:
-                print('✅ All recent items have been posted before')
-                sys.exit(0)
-
-        # Step 6: Curate based on topics using semantic similarity (shortlist generation)
-        shortlist_size = MAX_ITEMS_TO_POST * SHORTLIST_MULTIPLIER
-        print(f'🔎 Creating shortlist of top {shortlist_size} items based on embedding similarity...')
-        shortlist_items = await curator.curate_items(recent_items, topics, min_score=MIN_RELEVANCE_SCORE, max_items_to_post=shortlist_size)
-        print(f'Shortlist contains {len(shortlist_items)} items')
-
-        if len(shortlist_items) == 0:
-            print('✅ No relevant items found')
-            sys.exit(0)
-
-        # Step 7: Use LLM to select final items from shortlist
-        print(f'🤖 Using LLM to select top {MAX_ITEMS_TO_POST} items from shortlist...')
-        curated_items = await curator.llm_select_items(
-            shortlist_items,
-            topics,
-            SELECTION_GUIDANCE_PROMPT,
-            MAX_ITEMS_TO_POST,
-            model=SELECTION_MODEL
-        )
-        print(f'Selected {len(curated_items)} items for posting')
-
-        if len(curated_items) == 0:
-            print('✅ No items selected by LLM')
-            sys.exit(0)
-
-        # Initialize AI and Slack clients only when needed
-        summarizer = ClaudeSummarizer(
-            ANTHROPIC_API_KEY,
-            summarization_model=SUMMARIZATION_MODEL
-        )
-        slack_poster = SlackPoster(SLACK_TOKEN, SLACK_WEBHOOK)
-
-        # Step 8: Generate summaries
-        print('✍️  Generating AI summaries...')
-        items_with_summaries = await summarizer.summarize_batch(curated_items, topics)
-
-        # Step 9: Post to Slack
-        print('📤 Posting to Slack...')
-        await slack_poster.post_papers(SLACK_CHANNEL, items_with_summaries)
-
-        # Step 10: Cache posted article URLs (if cache enabled)
-        if article_cache:
-            posted_urls = [item.get('link') for item in items_with_summaries if item.get('link')]
-            article_cache.mark_batch_as_posted(posted_urls)
-            print(f'💾 Cached {len(posted_urls)} posted article URLs')
-
-        print('✅ WellRead Bot completed successfully!')
-
-    except Exception as error:
-        print(f'❌ Error: {str(error)}')
-        traceback.print_exc()
-        sys.exit(1)
+    await run(load_config())
 
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    try:
+        # libuv-based event loop; not available on Windows, where the default loop is used
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
@@ -0,0 +1,253 @@
+import os
+import sys
+import json
+import traceback
+from dataclasses import dataclass
+from typing import Optional
+
+from rss_parser import RSSFeedParser
+from curator import ContentCurator
+from article_cache import ArticleCache
+from feed_cache import FeedHTTPCache
+
+
+@dataclass
+class Config:
+    """Credentials from the environment plus settings from config.json."""
+    anthropic_api_key: str
+    openai_api_key: str
+    slack_token: str
+    slack_channel: str
+    slack_webhook: Optional[str]
+    timeframe_hours: int
+    max_items_to_post: int
+    min_relevance_score: float
+    embedding_cache_dir: str
+    summary_cache_dir: str
+    summary_similarity_threshold: float
+    summary_requests_per_minute: int
+    summary_batch_api: bool
+    summary_combined_request: bool
+    summary_post_short_descriptions: bool
+    embedding_dimensions: int
+    feed_cache_file: str
+    slack_max_concurrent_posts: int
+    slack_batch_posts: bool
+    shortlist_multiplier: int
+    selection_guidance_prompt: str
+    cache_posted_articles: bool
+    posted_articles_cache_file: str
+    summarization_model: str
+    selection_model: str
+
+
+def load_config(config_file: str = 'config.json') -> Config:
+    """Read credentials from the environment and settings from the config file, exiting if any are missing."""
+    # Load environment variables
+    anthropic_api_key = os.environ.get('ANTHROPIC_API_KEY')
+    openai_api_key = os.environ.get('OPENAI_API_KEY')
+    slack_token = os.environ.get('SLACK_BOT_TOKEN')
+    slack_channel = os.environ.get('SLACK_CHANNEL')
+
+    if not anthropic_api_key:
+        print('❌ ANTHROPIC_API_KEY environment variable is required')
+        sys.exit(1)
+
+    if not openai_api_key:
+        print('❌ OPENAI_API_KEY environment variable is required')
+        sys.exit(1)
+
+    if not slack_token or not slack_channel:
+        print('❌ SLACK_BOT_TOKEN and SLACK_CHANNEL environment variables are required')
+        sys.exit(1)
+
+    # Load configuration
+    with open(config_file, 'r') as f:
+        config = json.load(f)
+
+    # Get LLM model configurations
+    llm_models = config.get('llm_models', {})
+    summarization_model = llm_models['summarization']
+
+    return Config(
+        anthropic_api_key=anthropic_api_key,
+        openai_api_key=openai_api_key,
+        slack_token=slack_token,
+        slack_channel=slack_channel,
+        slack_webhook=os.environ.get('SLACK_WEBHOOK'),
+        timeframe_hours=config['timeframe_hours'],
+        max_items_to_post=config['max_items_to_post'],
+        min_relevance_score=config['min_relevance_score'],
+        embedding_cache_dir=config['embedding_cache_dir'],
+        # Settings added after the first release default as documented, so older config files keep working
+        summary_cache_dir=config.get('summary_cache_dir', 'cache/summaries'),
+        summary_similarity_threshold=config.get('summary_similarity_threshold', 0.92),
+        summary_requests_per_minute=config.get('summary_requests_per_minute', 50),
+        summary_batch_api=config.get('summary_batch_api', False),
+        summary_combined_request=config.get('summary_combined_request', False),
+        summary_post_short_descriptions=config.get('summary_post_short_descriptions', False),
+        embedding_dimensions=config.get('embedding_dimensions', 512),
+        feed_cache_file=config.get('feed_cache_file', 'cache/feeds.sqlite'),
+        slack_max_concurrent_posts=config.get('slack_max_concurrent_posts', 1),
+        slack_batch_posts=config.get('slack_batch_posts', False),
+        shortlist_multiplier=config['shortlist_multiplier'],
+        selection_guidance_prompt=config['selection_guidance_prompt'],
+        # Article cache configuration
+        cache_posted_articles=config['cache_posted_articles'],
+        posted_articles_cache_file=config['posted_articles_cache_file'],
+        summarization_model=summarization_model,
+        selection_model=llm_models.get('selection', summarization_model)
+    )
+
+
+async def run(cfg: Config):
+    """Fetch, curate, summarize and post one digest."""
+    print(f'⏰ Looking for posts from the last {cfg.timeframe_hours} hours')
+    print(f'📊 Maximum items to post: {cfg.max_items_to_post}')
+    print(f'🤖 Using model: {cfg.summarization_model}')
+    if cfg.cache_posted_articles:
+        print(f'💾 Article cache enabled')
+
+    # Initialize components
+    feed_cache = FeedHTTPCache(cfg.feed_cache_file)
+    feed_parser = RSSFeedParser(feed_cache)
+    curator = ContentCurator(
+        cfg.openai_api_key,
+        anthropic_api_key=cfg.anthropic_api_key,
+        cache_dir=cfg.embedding_cache_dir,
+        embedding_dimensions=cfg.embedding_dimensions
+    )
+
+    # Initialize article cache if enabled
+    article_cache = None
+    if cfg.cache_posted_articles:
+        article_cache = ArticleCache(cfg.posted_articles_cache_file)
+        print(f'📚 Loaded article cache with {article_cache.get_cache_size()} previously posted articles')
+
+    try:
+        # Step 1: Load feeds and topics
+        print('📡 Loading RSS feeds...')
+        feed_urls = feed_parser.load_feeds('feeds.txt')
+        print(f'Found {len(feed_urls)} feeds to monitor')
+
+        print('🎯 Loading topics of interest...')
+        topics = curator.load_topics('topics.txt')
+        print(f'Loaded {len(topics)} topics')
+
+        if len(feed_urls) == 0:
+            print('❌ No feeds configured in feeds.txt')
+            sys.exit(1)
+
+        if len(topics) == 0:
+            print('❌ No topics configured in topics.txt')
+            sys.exit(1)
+
+        # Step 2: Fetch all RSS feeds
+        print('🔍 Fetching RSS feeds...')
+        all_items = await feed_parser.fetch_all_feeds(feed_urls, cfg.timeframe_hours)
+        feed_cache.close()
+        print(f'Fetched {len(all_items)} total items')
+
+        # Step 3: Deduplicate by link URL
+        print('🔗 Deduplicating items by link URL...')
+        deduplicated_items = feed_parser.deduplicate_items(all_items)
+        duplicates_removed = len(all_items) - len(deduplicated_items)
+        print(f'{len(deduplicated_items)} unique items ({duplicates_removed} duplicates removed)')
+
+        # Step 4: Filter by timeframe
+        print(f'⏱️  Filtering items from last {cfg.timeframe_hours} hours...')
+        recent_items = feed_parser.filter_by_timeframe(deduplicated_items, cfg.timeframe_hours)
+        print(f'Found {len(recent_items)} recent items')
+
+        if len(recent_items) == 0:
+            print('✅ No new items to report')
+            sys.exit(0)
+
+        # Step 5: Filter out previously posted articles (if cache enabled)
+        if article_cache:
+            print('🔍 Filtering out previously posted articles...')
+            unposted_items = article_cache.filter_unposted(recent_items)
+            already_posted = len(recent_items) - len(unposted_items)
+            print(f'{len(unposted_items)} unposted items ({already_posted} already posted)')
+            recent_items = unposted_items
+
+            if len(recent_items) == 0:
+                print('✅ All recent items have been posted before')
+                sys.exit(0)
+
+        # Step 6: Curate based on topics using semantic similarity (shortlist generation)
+        shortlist_size = cfg.max_items_to_post * cfg.shortlist_multiplier
+        print(f'🔎 Creating shortlist of top {shortlist_size} items based on embedding similarity...')
+        shortlist_items = await curator.curate_items(recent_items, topics, min_score=cfg.min_relevance_score, max_items_to_post=shortlist_size)
+        print(f'Shortlist contains {len(shortlist_items)} items')
+
+        if len(shortlist_items) == 0:
+            print('✅ No relevant items found')
+            sys.exit(0)
+
+        # Step 7: Use LLM to select final items from shortlist
+        print(f'🤖 Using LLM to select top {cfg.max_items_to_post} items from shortlist...')
+        curated_items = await curator.llm_select_items(
+            shortlist_items,
+            topics,
+            cfg.selection_guidance_prompt,
+            cfg.max_items_to_post,
+            model=cfg.selection_model
+        )
+        print(f'Selected {len(curated_items)} items for posting')
+
+        if len(curated_items) == 0:
+            print('✅ No items selected by LLM')
+            sys.exit(0)
+
+        # Initialize AI and Slack clients only when needed (their SDKs are slow to import)
+        from summarizer import ClaudeSummarizer
+        from slack_poster import SlackPoster
+
+        summarizer = ClaudeSummarizer(
+            cfg.anthropic_api_key,
+            summarization_model=cfg.summarization_model,
+            cache_dir=cfg.summary_cache_dir,
+            text_embedding=curator.embed_texts,
+            similarity_threshold=cfg.summary_similarity_threshold,
+            requests_per_minute=cfg.summary_requests_per_minute,
+            post_short_descriptions=cfg.summary_post_short_descriptions
+        )
+        slack_poster = SlackPoster(cfg.slack_token, cfg.slack_webhook,
+                                   max_concurrent_posts=cfg.slack_max_concurrent_posts,
+                                   batch_posts=cfg.slack_batch_posts)
+
+        # Step 8/9: Generate summaries and post each to Slack as soon as it is ready
+        print('✍️  Generating AI summaries and posting to Slack...')
+        if cfg.summary_batch_api:
+            summarized_items = summarizer.stream_batch_summaries(curated_items, topics)
+        elif cfg.summary_combined_request:
+            summarized_items = summarizer.stream_combined_summaries(curated_items, topics)
+        else:
+            summarized_items = summarizer.stream_summaries(curated_items, topics)
+        try:
+            await slack_poster.post_papers(
+                cfg.slack_channel,
+                summarized_items,
+                len(curated_items)
+            )
+        finally:
+            await slack_poster.aclose()
+
+            # Step 10: Cache posted article URLs (if cache enabled), including those posted before a failure
+            if article_cache:
+                posted_urls = [url for item in slack_poster.posted if (url := item.link_canon)]
+                article_cache.mark_batch_as_posted(posted_urls, canonical=True)
+                article_cache.close()
+                print(f'💾 Cached {len(posted_urls)} posted article URLs')
+        if summarizer.cache_hits or summarizer.semantic_hits:
+            print(f'💾 Reused {summarizer.cache_hits} cached summaries '
+                  f'and {summarizer.semantic_hits} near-duplicate summaries')
+
+        print('✅ WellRead Bot completed successfully!')
+
+    except Exception as error:
+        print(f'❌ Error: {str(error)}')
+        traceback.print_exc()
+        sys.exit(1)
+
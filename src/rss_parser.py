@@ -1,14 +1,112 @@
-import feedparser
+import aiohttp
+import calendar
+import functools
+import os
+import xml.etree.ElementTree as ElementTree
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Any
+from email.utils import parsedate_to_datetime
+from typing import List, Dict, Any, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, urljoin
 import asyncio
+from dateutil import parser as date_parser
+
+from feed_cache import FeedHTTPCache
+
+
+FEED_FETCH_TIMEOUT_SECONDS = 15
+FEED_MAX_CONCURRENT_FETCHES = 50
+# The headers feedparser itself sends; spelled out so feedparser is only imported when a feed needs parsing
+FEED_REQUEST_HEADERS = {
+    'User-Agent': 'feedparser/6.0 +https://github.com/kurtmckee/feedparser/',
+    'Accept': 'application/atom+xml,application/rdf+xml,application/rss+xml,application/x-netcdf,'
+              'application/xml;q=0.9,text/xml;q=0.2,*/*;q=0.1',
+}
+
+# Opt-in: parse well-formed RSS 2.0 / RSS 1.0 / Atom feeds with ElementTree, falling back to feedparser
+FAST_PARSER_ENABLED = os.environ.get('WELLREAD_FAST_PARSER') == '1'
+
+ATOM_NS = '{http://www.w3.org/2005/Atom}'
+RSS1_NS = '{http://purl.org/rss/1.0/}'
+DC_NS = '{http://purl.org/dc/elements/1.1/}'
+CONTENT_NS = '{http://purl.org/rss/1.0/modules/content/}'
+
+
+@dataclass(slots=True)
+class FeedItem:
+    """A single feed entry, carrying the fields later pipeline steps attach to it."""
+    title: str
+    link: str
+    link_canon: str
+    pubDate: str
+    creator: Optional[str]
+    description: Optional[str]
+    content: Optional[str]
+    feedSource: str
+    pub_dt: Optional[datetime] = None
+    relevanceScore: Optional[float] = None
+    selection_explanation: Optional[str] = None
+    summary: Optional[str] = None
+
+
+def canonicalize_url(link: str) -> str:
+    """Normalize a link so trivially different variants of the same URL compare equal.
+
+    Lowercases the scheme and host, drops utm_* tracking parameters, the
+    fragment and any trailing slash on the path.
+    """
+    parts = urlsplit(link.strip())
+    query = parts.query
+    if 'utm_' in query:
+        query = urlencode([
+            (key, value)
+            for key, value in parse_qsl(query, keep_blank_values=True)
+            if not key.startswith('utm_')
+        ])
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip('/'), query, ''))
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_pub_date(value) -> datetime:
+    """Parse a feed date (string or struct_time) into a timezone-aware datetime.
+
+    RFC 822 and ISO 8601 dates - nearly all feed dates - are handled by the
+    stdlib; anything else falls back to dateutil. Naive dates are assumed UTC.
+    Results are memoized, since a feed's entries often share timestamps and
+    the same dates are checked again by `filter_by_timeframe`.
+    """
+    if isinstance(value, str):
+        try:
+            pub_date = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            try:
+                pub_date = datetime.fromisoformat(value)
+            except ValueError:
+                pub_date = date_parser.parse(value)
+    else:
+        # A time.struct_time from feedparser, always in UTC
+        pub_date = datetime.fromtimestamp(calendar.timegm(value), tz=timezone.utc)
+
+    if pub_date.tzinfo is None:
+        pub_date = pub_date.replace(tzinfo=timezone.utc)
+    return pub_date
+
+
+def published_before(value, cutoff: datetime) -> bool:
+    """Whether a feed date is known to be older than the cutoff; missing or unparseable dates are not."""
+    if not value:
+        return False
+    try:
+        return parse_pub_date(value) < cutoff
+    except Exception:
+        return False
 
 
 class RSSFeedParser:
-    def __init__(self):
-        pass
+    def __init__(self, feed_cache: FeedHTTPCache = None):
+        self.feed_cache = feed_cache
 
-    async def load_feeds(self, feeds_file: str = 'feeds.txt') -> List[str]:
+    def load_feeds(self, feeds_file: str = 'feeds.txt') -> List[str]:
         """Load RSS feed URLs from a text file."""
         with open(feeds_file, 'r', encoding='utf-8') as f:
             content = f.read()
@@ -19,124 +117,276 @@ class RSSFeedParser:
             if line.strip() and not line.strip().startswith('#')
         ]
 
-    def fetch_feed(self, url: str) -> Dict[str, Any]:
-        """Fetch and parse a single RSS feed."""
+    def _extract_items(self, feed, feed_title: str, cutoff: datetime = None) -> List[FeedItem]:
+        """Extract the fields we use from each parsed feed entry, skipping entries older than `cutoff`."""
+        items = []
+        for entry in feed.entries:
+            if cutoff:
+                # feedparser has already parsed the dates; use them before building anything
+                parsed_date = entry.get('published_parsed') if 'published' in entry else entry.get('updated_parsed')
+                if published_before(parsed_date, cutoff):
+                    continue
+
+            # Extract creator/author
+            creator = None
+            if hasattr(entry, 'author'):
+                creator = entry.author
+            elif hasattr(entry, 'dc_creator'):
+                creator = entry.dc_creator
+
+            # Extract description
+            description = None
+            if hasattr(entry, 'summary'):
+                description = entry.summary
+            elif hasattr(entry, 'description'):
+                description = entry.description
+
+            # Extract content
+            content = None
+            if hasattr(entry, 'content') and entry.content:
+                content = entry.content[0].get('value', '')
+            elif hasattr(entry, 'content_encoded'):
+                content = entry.content_encoded
+
+            link = entry.get('link', '')
+            items.append(FeedItem(
+                title=entry.get('title', 'No title'),
+                link=link,
+                link_canon=canonicalize_url(link) if link else '',
+                pubDate=entry.get('published', entry.get('updated', '')),
+                creator=creator,
+                description=description,
+                content=content,
+                feedSource=feed_title
+            ))
+
+        return items
+
+    def _parse_feed_fast(self, body: bytes, base_url: str, cutoff: datetime = None) -> Dict[str, Any]:
+        """Extract items from a well-formed feed with ElementTree.
+
+        Returns None for documents it does not handle (malformed XML or an
+        unknown format) so the caller can fall back to feedparser.
+        """
         try:
-            feed = feedparser.parse(url)
-
-            if feed.bozo and not feed.entries:
-                # Feed parsing failed
-                raise Exception(f"Failed to parse feed: {getattr(feed, 'bozo_exception', 'Unknown error')}")
-
-            feed_title = feed.feed.get('title', 'Unknown Feed')
-
-            items = []
-            for entry in feed.entries:
-                # Extract creator/author
-                creator = None
-                if hasattr(entry, 'author'):
-                    creator = entry.author
-                elif hasattr(entry, 'dc_creator'):
-                    creator = entry.dc_creator
-
-                # Extract description
-                description = None
-                if hasattr(entry, 'summary'):
-                    description = entry.summary
-                elif hasattr(entry, 'description'):
-                    description = entry.description
-
-                # Extract content
-                content = None
-                if hasattr(entry, 'content') and entry.content:
-                    content = entry.content[0].get('value', '')
-                elif hasattr(entry, 'content_encoded'):
-                    content = entry.content_encoded
-
-                items.append({
-                    'title': entry.get('title', 'No title'),
-                    'link': entry.get('link', ''),
-                    'pubDate': entry.get('published', entry.get('updated', '')),
-                    'creator': creator,
-                    'description': description,
-                    'content': content,
-                    'feedSource': feed_title
-                })
+            root = ElementTree.fromstring(body)
+        except ElementTree.ParseError:
+            return None
 
-            return {
-                'success': True,
-                'feedTitle': feed_title,
-                'items': items
-            }
+        def link_url(link):
+            # Resolve relative links against the final feed URL, as feedparser does
+            return urljoin(base_url, link) if link else ''
+
+        def text(element, *tags):
+            for tag in tags:
+                value = element.findtext(tag)
+                if value:
+                    return value.strip()
+            return None
+
+        items = []
+        if root.tag == 'rss':
+            channel = root.find('channel')
+            if channel is None:
+                return None
+            feed_title = text(channel, 'title') or 'Unknown Feed'
+            for entry in channel.iter('item'):
+                pub_date = text(entry, 'pubDate', f'{DC_NS}date') or ''
+                if cutoff and published_before(pub_date, cutoff):
+                    continue
+                link = link_url(text(entry, 'link'))
+                items.append(FeedItem(
+                    title=text(entry, 'title') or 'No title',
+                    link=link,
+                    link_canon=canonicalize_url(link) if link else '',
+                    pubDate=pub_date,
+                    creator=text(entry, 'author', f'{DC_NS}creator'),
+                    description=text(entry, 'description'),
+                    content=text(entry, f'{CONTENT_NS}encoded'),
+                    feedSource=feed_title
+                ))
+        elif root.tag.endswith('}RDF'):
+            feed_title = text(root, f'{RSS1_NS}channel/{RSS1_NS}title') or 'Unknown Feed'
+            for entry in root.iter(f'{RSS1_NS}item'):
+                pub_date = text(entry, f'{DC_NS}date') or ''
+                if cutoff and published_before(pub_date, cutoff):
+                    continue
+                link = link_url(text(entry, f'{RSS1_NS}link'))
+                items.append(FeedItem(
+                    title=text(entry, f'{RSS1_NS}title') or 'No title',
+                    link=link,
+                    link_canon=canonicalize_url(link) if link else '',
+                    pubDate=pub_date,
+                    creator=text(entry, f'{DC_NS}creator'),
+                    description=text(entry, f'{RSS1_NS}description'),
+                    content=text(entry, f'{CONTENT_NS}encoded'),
+                    feedSource=feed_title
+                ))
+        elif root.tag == f'{ATOM_NS}feed':
+            feed_title = text(root, f'{ATOM_NS}title') or 'Unknown Feed'
+            for entry in root.iter(f'{ATOM_NS}entry'):
+                pub_date = text(entry, f'{ATOM_NS}published', f'{ATOM_NS}updated') or ''
+                if cutoff and published_before(pub_date, cutoff):
+                    continue
+                link = ''
+                for link_element in entry.iter(f'{ATOM_NS}link'):
+                    if link_element.get('rel', 'alternate') == 'alternate':
+                        link = link_url(link_element.get('href', ''))
+                        break
+                items.append(FeedItem(
+                    title=text(entry, f'{ATOM_NS}title') or 'No title',
+                    link=link,
+                    link_canon=canonicalize_url(link) if link else '',
+                    pubDate=pub_date,
+                    creator=text(entry, f'{ATOM_NS}author/{ATOM_NS}name'),
+                    description=text(entry, f'{ATOM_NS}summary'),
+                    content=text(entry, f'{ATOM_NS}content'),
+                    feedSource=feed_title
+                ))
+        else:
+            return None
+
+        return {
+            'success': True,
+            'feedTitle': feed_title,
+            'items': items
+        }
+
+    def parse_feed(self, body: bytes, url: str, response_headers: Dict[str, str] = None,
+                   cutoff: datetime = None) -> Dict[str, Any]:
+        """Parse an already-downloaded RSS/Atom document (CPU only, no network).
+
+        Safe to run in a worker thread; `url` is only used to resolve relative links.
+        """
+        if response_headers is None:
+            response_headers = {'content-location': url}
+
+        if FAST_PARSER_ENABLED:
+            result = self._parse_feed_fast(body, response_headers.get('content-location', url), cutoff)
+            if result is not None:
+                return result
+
+        import feedparser
+        feed = feedparser.parse(body, response_headers=response_headers)
+
+        if feed.bozo and not feed.entries:
+            # Feed parsing failed
+            raise Exception(f"Failed to parse feed: {getattr(feed, 'bozo_exception', 'Unknown error')}")
+
+        feed_title = feed.feed.get('title', 'Unknown Feed')
+
+        return {
+            'success': True,
+            'feedTitle': feed_title,
+            'items': self._extract_items(feed, feed_title, cutoff)
+        }
+
+    async def fetch_feed(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, url: str,
+                         cutoff: datetime = None) -> Dict[str, Any]:
+        """Fetch and parse a single RSS feed, keeping only entries newer than `cutoff` if given."""
+        try:
+            request_headers = self.feed_cache.conditional_headers(url) if self.feed_cache else {}
+            async with semaphore:
+                async with session.get(url, headers=request_headers) as response:
+                    if response.status == 304 and self.feed_cache:
+                        # Unchanged since the last run - reuse the previous parse
+                        cached_result = self.feed_cache.get_result(url)
+                        if cached_result is None:
+                            raise Exception("Feed not modified but no cached copy is available")
+                        return cached_result
+
+                    response.raise_for_status()
+                    body = await response.read()
+                    # Let feedparser see the real content type and resolve relative links against the final URL
+                    response_headers = {key.lower(): value for key, value in response.headers.items()}
+                    response_headers['content-location'] = str(response.url)
+
+            if self.feed_cache:
+                # Servers that ignore conditional requests may still send an identical body
+                cached_result = self.feed_cache.get_result(url, body)
+                if cached_result is not None:
+                    return cached_result
+
+            # Parse off the event loop so other downloads keep flowing meanwhile
+            result = await asyncio.get_running_loop().run_in_executor(
+                None, self.parse_feed, body, url, response_headers, cutoff
+            )
+
+            if self.feed_cache:
+                self.feed_cache.store(url, response_headers.get('etag'), response_headers.get('last-modified'), body, result)
+
+            return result
         except Exception as error:
-            print(f"Error fetching feed {url}: {str(error)}")
+            print(f"Error fetching feed {url}: {str(error) or type(error).__name__}")
             return {
                 'success': False,
                 'error': str(error)
             }
 
-    async def fetch_all_feeds(self, feed_urls: List[str]) -> List[Dict[str, Any]]:
-        """Fetch all RSS feeds concurrently."""
-        # Run feed parsing in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        results = await asyncio.gather(
-            *[loop.run_in_executor(None, self.fetch_feed, url) for url in feed_urls]
-        )
+    async def fetch_all_feeds(self, feed_urls: List[str], hours_ago: int = None) -> List[FeedItem]:
+        """Fetch all RSS feeds concurrently over one shared HTTP session.
+
+        With `hours_ago`, entries older than the window are skipped while parsing;
+        `filter_by_timeframe` still validates what is left.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=hours_ago) if hours_ago else None
+        semaphore = asyncio.Semaphore(FEED_MAX_CONCURRENT_FETCHES)
+        async with aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=FEED_FETCH_TIMEOUT_SECONDS),
+            connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300),
+            headers=FEED_REQUEST_HEADERS
+        ) as session:
+            # fetch_feed reports per-feed failures in its result, so anything escaping the
+            # task group (e.g. cancellation) is fatal and cancels the remaining fetches
+            async with asyncio.TaskGroup() as task_group:
+                tasks = [
+                    task_group.create_task(self.fetch_feed(session, semaphore, url, cutoff))
+                    for url in feed_urls
+                ]
 
-        # Flatten all items from successful feeds
+        if self.feed_cache:
+            self.feed_cache.commit()
+
+        # Flatten all items from successful feeds, in feed order
         all_items = []
-        for result in results:
+        for task in tasks:
+            result = task.result()
             if result['success']:
                 all_items.extend(result['items'])
 
         return all_items
 
-    def deduplicate_items(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Remove duplicate items based on link URL, keeping the first occurrence."""
-        seen_links = set()
-        deduplicated = []
+    def deduplicate_items(self, items: List[FeedItem]) -> List[FeedItem]:
+        """Remove duplicate items based on canonical link URL, keeping the first occurrence."""
+        keyed = {}
+        no_link = []
 
         for item in items:
-            link = item.get('link', '')
-            if link and link not in seen_links:
-                seen_links.add(link)
-                deduplicated.append(item)
-            elif not link:
+            link_canon = item.link_canon
+            if not link_canon:
                 # If there's no link, keep the item (don't deduplicate)
-                deduplicated.append(item)
+                no_link.append(item)
+                continue
+            keyed.setdefault(link_canon, item)
 
-        return deduplicated
+        return list(keyed.values()) + no_link
 
-    def filter_by_timeframe(self, items: List[Dict[str, Any]], hours_ago: int = 24) -> List[Dict[str, Any]]:
+    def filter_by_timeframe(self, items: List[FeedItem], hours_ago: int = 24) -> List[FeedItem]:
         """Filter items to only those published within the specified timeframe."""
         # Use timezone-aware UTC time for comparison
         cutoff_time = datetime.now(timezone.utc) - timedelta(hours=hours_ago)
 
         filtered_items = []
         for item in items:
-            if not item.get('pubDate'):
+            if not item.pubDate:
                 continue
 
             try:
-                # Parse various date formats
-                pub_date_str = item['pubDate']
-                # feedparser typically provides struct_time, but handle string too
-                if isinstance(pub_date_str, str):
-                    from dateutil import parser as date_parser
-                    pub_date = date_parser.parse(pub_date_str)
-                else:
-                    # It's likely a time.struct_time from feedparser
-                    import time
-                    pub_date = datetime.fromtimestamp(time.mktime(pub_date_str), tz=timezone.utc)
-
-                # If pub_date is naive, assume UTC
-                if pub_date.tzinfo is None:
-                    pub_date = pub_date.replace(tzinfo=timezone.utc)
-
+                pub_date = item.pub_dt = parse_pub_date(item.pubDate)
                 if pub_date > cutoff_time:
                     filtered_items.append(item)
             except Exception as e:
-                print(f"Error parsing date for item '{item.get('title', 'Unknown')}': {str(e)}")
+                print(f"Error parsing date for item '{item.title}': {str(e)}")
                 continue
 
         return filtered_items
@@ -0,0 +1,58 @@
+from typing import List, Optional
+
+import numpy as np
+from diskcache import Cache
+
+from embedding_store import EmbeddingStore
+
+
+class SemanticSummaryCache:
+    """Finds the cached summary of a near-duplicate item by embedding.
+
+    Each summarized item's normalized title-and-lede embedding is kept in an
+    `EmbeddingStore` under its summary cache key; a lookup is one matrix-vector
+    product over the stored rows. Summary text itself stays in the exact-match
+    cache, so rows whose summary has expired there are skipped.
+    """
+
+    def __init__(self, store_dir: str, summaries: Cache, threshold: float):
+        self.store_dir = store_dir
+        self.summaries = summaries
+        self.threshold = threshold
+        # Opened on first use, once the embedding width is known
+        self.store: Optional[EmbeddingStore] = None
+        self._row_keys: List[str] = []
+
+    def _open(self, dim: int) -> EmbeddingStore:
+        if self.store is None:
+            self.store = EmbeddingStore(self.store_dir, dim)
+            self._row_keys = [None] * len(self.store)
+            for key, row in self.store.index.items():
+                self._row_keys[row] = key
+        return self.store
+
+    def lookup(self, vector: np.ndarray) -> Optional[str]:
+        """Return the summary of the most similar stored item above the threshold, if any."""
+        store = self._open(len(vector))
+        if not len(store):
+            return None
+
+        similarities = store.matrix[:len(store)] @ vector
+        candidates = np.flatnonzero(similarities >= self.threshold)
+        for row in candidates[np.argsort(-similarities[candidates])].tolist():
+            summary = self.summaries.get(self._row_keys[row])
+            if summary is not None:
+                return summary
+        return None
+
+    def add(self, vector: np.ndarray, summary_key: str):
+        """Remember a summarized item's embedding under its summary cache key."""
+        store = self._open(len(vector))
+        if summary_key not in store.index:
+            self._row_keys.append(summary_key)
+        store.set(summary_key, vector)
+
+    def flush(self):
+        """Write new embeddings to disk."""
+        if self.store is not None:
+            self.store.flush()
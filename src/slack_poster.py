@@ -1,14 +1,156 @@
 import asyncio
+import functools
+import re
 from datetime import datetime
-from typing import List, Dict, Any
-from slack_sdk import WebClient
+from typing import List, Dict, Any, AsyncIterable, AsyncIterator
+import aiohttp
+import tenacity
+from aiolimiter import AsyncLimiter
 from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_client import AsyncWebClient
+
+from rss_parser import FeedItem
+
+# chat.postMessage allows roughly one message per second per channel, with short bursts
+SLACK_MESSAGES_PER_MINUTE = 45
+SLACK_MAX_RETRIES = 5
+SLACK_MAX_CONNECTIONS = 64
+# Back off concurrent posts when Slack reports this few requests left in the current window
+SLACK_LOW_RATE_LIMIT_REMAINING = 2
+# Rate limiting and transient server errors; anything else (bad channel, auth...) fails immediately
+SLACK_RETRYABLE_STATUSES = (429, 500, 502, 503)
+# chat.postMessage accepts at most 50 blocks; a batched paper takes a section, a context and a divider
+SLACK_MAX_BLOCKS_PER_MESSAGE = 50
+PAPERS_PER_BATCHED_MESSAGE = SLACK_MAX_BLOCKS_PER_MESSAGE // 3
+
+# Markdown that Slack's mrkdwn renders differently: "## Header" lines and **bold**
+MARKDOWN_HEADER_RE = re.compile(r'^#{1,6}\s+(.+)$', re.MULTILINE)
+MARKDOWN_BOLD_RE = re.compile(r'\*\*(.+?)\*\*')
+# Anything format_summary_for_slack would change: headers, bold, padded or blank lines, and
+# bullets other than "• text"
+NEEDS_SLACK_FORMATTING_RE = re.compile(r'^#|\*\*|^[^\S\n]|[^\S\n]$|^$|^(?:[-*]|•(?! \S))', re.MULTILINE)
+
+# Static Block Kit blocks, shared by every message (Slack only serializes them)
+DIVIDER_BLOCK = {'type': 'divider'}
+DIGEST_HEADER_BLOCK = {
+    'type': 'header',
+    'text': {
+        'type': 'plain_text',
+        'text': "📰 WellRead Digest"
+    }
+}
+
+
+def _is_retryable_slack_error(error: BaseException) -> bool:
+    """Whether a failed Slack call is worth retrying."""
+    return isinstance(error, SlackApiError) and error.response.status_code in SLACK_RETRYABLE_STATUSES
+
+
+_slack_backoff = tenacity.wait_exponential(multiplier=1, max=30) + tenacity.wait_random(0, 1)
+
+
+def _slack_retry_wait(retry_state: tenacity.RetryCallState) -> float:
+    """Wait as long as Slack's Retry-After header asks, else back off exponentially with jitter."""
+    retry_after = retry_state.outcome.exception().response.headers.get('Retry-After')
+    if retry_after:
+        return float(retry_after)
+    return _slack_backoff(retry_state)
+
+
+def _log_slack_retry(retry_state: tenacity.RetryCallState):
+    """Report a failed Slack call before tenacity sleeps and retries it."""
+    error = retry_state.outcome.exception()
+    if error.response.status_code == 429:
+        # Rate limited: fewer posts in flight until Slack has headroom again
+        retry_state.args[0]._post_limit.back_off()
+    print(f"Slack request failed ({error.response.status_code}), retrying in {retry_state.next_action.sleep:.0f}s...")
+
+
+class AdaptiveConcurrencyLimit:
+    """Caps concurrent posts; halves the cap when Slack pushes back and raises it one step per healthy response.
+
+    Used as `async with limit:`. The cap never exceeds the configured maximum,
+    so a maximum of 1 keeps posts strictly sequential.
+    """
+
+    def __init__(self, maximum: int):
+        self.maximum = maximum
+        self.limit = maximum
+        self._active = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+
+    async def __aexit__(self, *exc_info):
+        async with self._condition:
+            self._active -= 1
+            self._condition.notify()
+
+    def back_off(self):
+        """Halve the cap (in-flight posts finish; new ones wait until under it)."""
+        self.limit = max(1, self.limit // 2)
+
+    async def recover(self):
+        """Raise the cap by one, up to the maximum, and admit a waiting post."""
+        if self.limit < self.maximum:
+            async with self._condition:
+                self.limit += 1
+                self._condition.notify()
+
+
+def section_block(text: str) -> Dict[str, Any]:
+    """A mrkdwn section block."""
+    return {'type': 'section', 'text': {'type': 'mrkdwn', 'text': text}}
+
+
+def context_block(text: str) -> Dict[str, Any]:
+    """A context block with a single mrkdwn element."""
+    return {'type': 'context', 'elements': [{'type': 'mrkdwn', 'text': text}]}
 
 
 class SlackPoster:
-    def __init__(self, token: str, webhook: str = None):
-        self.client = WebClient(token=token)
+    def __init__(self, token: str, webhook: str = None, max_concurrent_posts: int = 1, batch_posts: bool = False):
+        # One keep-alive session for every Slack call instead of a connection per message;
+        # idle connections are kept long enough to bridge the wait for the next summary
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit_per_host=SLACK_MAX_CONNECTIONS, keepalive_timeout=60)
+        )
+        self.client = AsyncWebClient(token=token, session=self._session)
         self.webhook = webhook
+        self._limiter = AsyncLimiter(SLACK_MESSAGES_PER_MINUTE, 60)
+        # Paper posts in flight at once; more than one can land in the channel out of ranked order
+        self._post_limit = AdaptiveConcurrencyLimit(max_concurrent_posts)
+        # Post several papers per message instead of one message each
+        self.batch_posts = batch_posts
+        # Every paper whose post succeeded, kept even if a later post or summary fails
+        self.posted: List[FeedItem] = []
+
+    async def aclose(self):
+        """Close the shared HTTP session."""
+        await self._session.close()
+
+    @tenacity.retry(
+        wait=_slack_retry_wait,
+        stop=tenacity.stop_after_attempt(SLACK_MAX_RETRIES + 1),
+        retry=tenacity.retry_if_exception(_is_retryable_slack_error),
+        before_sleep=_log_slack_retry,
+        reraise=True,
+    )
+    async def _post_message(self, message: Dict[str, Any]):
+        """Post a message within the rate limit, retrying 429s and transient server errors."""
+        async with self._limiter:
+            response = await self.client.chat_postMessage(**message)
+
+        # Slack doesn't always send rate limit headers; when it does, ease off before hitting a 429
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        if remaining is not None and int(remaining) <= SLACK_LOW_RATE_LIMIT_REMAINING:
+            self._post_limit.back_off()
+        else:
+            await self._post_limit.recover()
+        return response
 
     async def post_header(self, channel: str) -> str:
         """Post a header message to separate from previous posts."""
@@ -18,52 +160,35 @@ class SlackPoster:
             'channel': channel,
             'text': f"📰 WellRead Digest - {today}",
             'blocks': [
-                {
-                    'type': 'divider'
-                },
-                {
-                    'type': 'header',
-                    'text': {
-                        'type': 'plain_text',
-                        'text': f"📰 WellRead Digest"
-                    }
-                },
-                {
-                    'type': 'context',
-                    'elements': [
-                        {
-                            'type': 'mrkdwn',
-                            'text': f"_{today}_"
-                        }
-                    ]
-                },
-                {
-                    'type': 'divider'
-                }
+                DIVIDER_BLOCK,
+                DIGEST_HEADER_BLOCK,
+                context_block(f"_{today}_"),
+                DIVIDER_BLOCK
             ]
         }
 
         try:
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                None,
-                lambda: self.client.chat_postMessage(**message)
-            )
+            result = await self._post_message(message)
             return result['ts']
         except SlackApiError as error:
             print(f"Error posting header: {error.response['error']}")
             raise error
 
-    def format_summary_for_slack(self, summary: str) -> str:
-        """Format summary text for proper Slack markdown display."""
-        import re
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def format_summary_for_slack(summary: str) -> str:
+        """Format summary text for proper Slack markdown display (memoized per summary)."""
+        # Summaries already written with "• " bullets and no markdown come back unchanged
+        stripped = summary.strip()
+        if not NEEDS_SLACK_FORMATTING_RE.search(stripped):
+            return stripped
 
         # First, convert markdown headers to bold text
         # Replace ## Header or # Header with *Header*
-        summary = re.sub(r'^#{1,6}\s+(.+)$', r'*\1*', summary, flags=re.MULTILINE)
+        summary = MARKDOWN_HEADER_RE.sub(r'*\1*', summary)
 
         # Convert **bold** to *bold* (Slack uses single asterisks for bold)
-        summary = re.sub(r'\*\*(.+?)\*\*', r'*\1*', summary)
+        summary = MARKDOWN_BOLD_RE.sub(r'*\1*', summary)
 
         # Ensure bullet points are properly formatted with line breaks
         lines = summary.strip().split('\n')
@@ -98,89 +223,134 @@ class SlackPoster:
 
         return '\n'.join(formatted_lines)
 
-    async def post_paper_with_summary(self, channel: str, paper: Dict[str, Any], index: int, total: int) -> str:
+    def paper_blocks(self, paper: FeedItem, index: int) -> List[Dict[str, Any]]:
+        """The section and context blocks showing one paper and its summary.
+
+        `index` counts papers actually posted; the digest has no fixed total
+        because a paper whose summary fails is left out.
+        """
+        # Format publication date (parsed once by filter_by_timeframe)
+        pub_date = paper.pub_dt.strftime('%m/%d/%Y') if paper.pub_dt else 'Unknown date'
+
+        # Get and format summary
+        summary = paper.summary or 'No summary available'
+        formatted_summary = self.format_summary_for_slack(summary)
+
+        return [
+            section_block(f"*<{paper.link}|{paper.title}>*\n\n{formatted_summary}"),
+            context_block(f"*#{index}* • {paper.feedSource} • {pub_date}")
+        ]
+
+    async def post_paper_with_summary(self, channel: str, paper: FeedItem, index: int) -> str:
         """Post a single paper as a top-level message with summary included."""
+        title = paper.title
         try:
-            # Format publication date
-            pub_date = 'Unknown date'
-            if paper.get('pubDate'):
-                try:
-                    if isinstance(paper['pubDate'], str):
-                        from dateutil import parser as date_parser
-                        parsed_date = date_parser.parse(paper['pubDate'])
-                        pub_date = parsed_date.strftime('%m/%d/%Y')
-                    else:
-                        import time
-                        parsed_date = datetime.fromtimestamp(time.mktime(paper['pubDate']))
-                        pub_date = parsed_date.strftime('%m/%d/%Y')
-                except Exception:
-                    pub_date = 'Unknown date'
-
-            # Get and format summary
-            summary = paper.get('summary', 'No summary available')
-            formatted_summary = self.format_summary_for_slack(summary)
-
             # Post the paper with summary as top-level message
             paper_message = {
                 'channel': channel,
-                'text': paper.get('title', 'No title'),
-                'blocks': [
-                    {
-                        'type': 'section',
-                        'text': {
-                            'type': 'mrkdwn',
-                            'text': f"*<{paper.get('link', '')}|{paper.get('title', 'No title')}>*\n\n{formatted_summary}"
-                        }
-                    },
-                    {
-                        'type': 'context',
-                        'elements': [
-                            {
-                                'type': 'mrkdwn',
-                                'text': f"*{index}/{total}* • {paper.get('feedSource', 'Unknown')} • {pub_date}"
-                            }
-                        ]
-                    }
-                ]
+                'text': title,
+                'blocks': self.paper_blocks(paper, index)
             }
 
-            loop = asyncio.get_event_loop()
-            paper_result = await loop.run_in_executor(
-                None,
-                lambda: self.client.chat_postMessage(**paper_message)
-            )
-
+            paper_result = await self._post_message(paper_message)
             return paper_result['ts']
         except SlackApiError as error:
-            print(f"Error posting paper \"{paper.get('title', 'Unknown')}\": {error.response['error']}")
+            print(f"Error posting paper \"{title}\": {error.response['error']}")
             raise error
 
-    async def post_all_papers(self, channel: str, papers: List[Dict[str, Any]]) -> List[str]:
-        """Post all papers as top-level messages."""
-        total = len(papers)
-        timestamps = []
+    async def post_paper_batch(self, channel: str, papers: List[FeedItem], first_index: int) -> str:
+        """Post several papers as one top-level message, separated by dividers."""
+        last_index = first_index + len(papers) - 1
+        blocks = []
+        for index, paper in enumerate(papers, first_index):
+            if blocks:
+                blocks.append(DIVIDER_BLOCK)
+            blocks.extend(self.paper_blocks(paper, index))
+
+        try:
+            batch_result = await self._post_message({
+                'channel': channel,
+                'text': f"Papers {first_index}-{last_index}",
+                'blocks': blocks
+            })
+            return batch_result['ts']
+        except SlackApiError as error:
+            print(f"Error posting papers {first_index}-{last_index}: {error.response['error']}")
+            raise error
+
+    async def post_all_papers(self, channel: str, papers: AsyncIterable[FeedItem]) -> List[FeedItem]:
+        """Post papers as top-level messages as they arrive, returning the papers posted.
+
+        Up to `max_concurrent_posts` posts overlap (one by default, which keeps
+        the channel in ranked order); pacing comes from the shared rate limiter
+        rather than fixed sleeps.
+        """
+        async def post(paper: FeedItem, index: int) -> FeedItem:
+            async with self._post_limit:
+                await self.post_paper_with_summary(channel, paper, index)
+            self.posted.append(paper)
+            return paper
+
+        tasks = []
+        try:
+            async for paper in papers:
+                tasks.append(asyncio.create_task(post(paper, len(tasks) + 1)))
+
+            return list(await asyncio.gather(*tasks))
+        except Exception:
+            # Let posts already under way finish, so everything that reached Slack is recorded in `posted`
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            # On failure, don't leave posts running in the background
+            for task in tasks:
+                task.cancel()
 
-        for i, paper in enumerate(papers):
-            ts = await self.post_paper_with_summary(channel, paper, i + 1, total)
-            timestamps.append(ts)
+    async def post_all_papers_batched(self, channel: str, papers: AsyncIterable[FeedItem]) -> List[FeedItem]:
+        """Post papers in messages of up to `PAPERS_PER_BATCHED_MESSAGE`, returning the papers posted.
 
-            # Rate limiting between papers
-            if i < len(papers) - 1:
-                await asyncio.sleep(1)
+        Each message is sent as soon as it fills up (or the papers run out),
+        so a digest of N papers takes about N / 16 Slack calls instead of N.
+        """
+        posted = []
+        batch = []
 
-        return timestamps
+        async def flush():
+            await self.post_paper_batch(channel, batch, len(posted) + 1)
+            posted.extend(batch)
+            self.posted.extend(batch)
+            batch.clear()
 
-    async def post_papers(self, channel: str, papers: List[Dict[str, Any]]):
-        """Post header, then all papers."""
-        print(f"Posting header to channel {channel}...")
-        await self.post_header(channel)
+        async for paper in papers:
+            batch.append(paper)
+            if len(batch) == PAPERS_PER_BATCHED_MESSAGE:
+                await flush()
+        if batch:
+            await flush()
+        return posted
 
-        # Small delay after header
-        await asyncio.sleep(1)
+    async def post_papers(self, channel: str, papers: AsyncIterable[FeedItem], total: int) -> List[FeedItem]:
+        """Post header, then each paper (or batch of papers) as soon as it is available.
 
-        print(f"Posting {len(papers)} papers...")
+        The header goes out only once the first paper is ready, so a run whose
+        summaries all fail posts nothing.
+        """
+        async def after_header(papers: AsyncIterable[FeedItem]) -> AsyncIterator[FeedItem]:
+            header_posted = False
+            async for paper in papers:
+                if not header_posted:
+                    # The header must land before the first paper
+                    print(f"Posting header to channel {channel}...")
+                    await self.post_header(channel)
+                    header_posted = True
+                yield paper
 
-        # Post each paper as a top-level message
-        await self.post_all_papers(channel, papers)
+        print(f"Posting up to {total} papers...")
+        if self.batch_posts:
+            posted = await self.post_all_papers_batched(channel, after_header(papers))
+        else:
+            # Post each paper as a top-level message
+            posted = await self.post_all_papers(channel, after_header(papers))
 
-        print('All papers posted!')
+        print(f'All {len(posted)} papers posted!')
+        return posted
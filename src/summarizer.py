@@ -1,92 +1,566 @@
 import asyncio
-from typing import List, Dict, Any
+import functools
+import hashlib
+import html
+import os
+import re
+import time
+from dataclasses import replace
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, AsyncIterator, Optional, Tuple
 
+import anthropic
 import tenacity
-from anthropic import Anthropic
+from aiolimiter import AsyncLimiter
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+import numpy as np
+from diskcache import Cache
 from tqdm import tqdm
 
+from rss_parser import FeedItem
+from semantic_cache import SemanticSummaryCache
 
-class ClaudeSummarizer:
-    def __init__(self, api_key: str, summarization_model: str = "claude-sonnet-4-5-20250929"):
-        self.client = Anthropic(api_key=api_key)
-        self.summarization_model = summarization_model
+# Default summary requests started per minute, shared by all concurrent summaries
+SUMMARY_REQUESTS_PER_MINUTE = 50
 
-    @tenacity.retry(
-        wait=tenacity.wait_fixed(0.1),
-        stop=tenacity.stop_after_attempt(10),
-        reraise=True,
-    )
-    async def summarize_paper(self, item: Dict[str, Any], topics: List[str]) -> str:
-        """Generate a summary for a single paper/item."""
-        author_line = f"Author: {item['creator']}\n" if item.get('creator') else ""
+# Hold new summary requests until the rate limit window resets when Anthropic reports this few requests left
+SUMMARY_LOW_RATE_LIMIT_REMAINING = 2
 
-        prompt = f"""You are analyzing an RSS feed item. Here are the details:
+# Bump when the summary prompt changes so cached summaries from the old prompt are not reused
+SUMMARY_CACHE_KEY_VERSION = "v4"
+SUMMARY_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
 
-Title: {item.get('title', 'No title')}
-Source: {item.get('feedSource', 'Unknown source')}
-{author_line}
-Content:
-{item.get('description') or item.get('content') or 'No content available'}
+# Room for the author line and three one-sentence bullets; output length dominates latency
+SUMMARY_MAX_TOKENS = 150
+
+# Item text sent to the model; the lede is enough for three bullets
+SUMMARY_CONTENT_MAX_CHARS = 4000
+HTML_SKIPPED_ELEMENT_RE = re.compile(r'<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+WHITESPACE_RE = re.compile(r'\s+')
+SENTENCE_END_RE = re.compile(r'[.!?](?=\s)')
+
+# Lede length embedded with the title to recognize the same story published by another feed
+NEAR_DUPLICATE_CONTENT_CHARS = 512
+
+# With post_short_descriptions, item text this short (at most three sentences) is posted as is; a summary
+# would be no shorter. Too few words, or journal metadata ("Published online: ...; doi:...") is not an abstract
+SUMMARY_VERBATIM_MAX_CHARS = 400
+SUMMARY_VERBATIM_MAX_SENTENCES = 3
+SUMMARY_VERBATIM_MIN_WORDS = 15
+METADATA_DESCRIPTION_RE = re.compile(r'\bdoi:|published online', re.IGNORECASE)
+
+# Message Batches status polling, doubling from the initial interval
+BATCH_POLL_INITIAL_SECONDS = 5
+BATCH_POLL_MAX_SECONDS = 60
+
+# Tool that combined requests must call, so their summaries come back as structured input rather than free text
+RECORD_SUMMARIES_TOOL = {
+    'name': 'record_summaries',
+    'description': 'Record the summary of every RSS feed item, identified by its item number.',
+    'input_schema': {
+        'type': 'object',
+        'properties': {
+            'summaries': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'item': {'type': 'integer', 'description': 'The item number'},
+                        'summary': {'type': 'string', 'description': 'The summary, formatted as instructed'}
+                    },
+                    'required': ['item', 'summary']
+                }
+            }
+        },
+        'required': ['summaries']
+    }
+}
+
+# Anthropic errors worth retrying: rate limits, overload/5xx and network trouble (including timeouts)
+RETRYABLE_ERRORS = (anthropic.RateLimitError, anthropic.InternalServerError, anthropic.APIConnectionError)
+# Error types Anthropic reports in the event stream of an already successful (200) streaming response
+RETRYABLE_STREAM_ERROR_TYPES = ('overloaded_error', 'api_error', 'rate_limit_error')
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Whether a failed request is transient.
+
+    529 Overloaded is not an InternalServerError in newer SDKs, and an error
+    event mid-stream arrives as a plain APIStatusError with the 200 status of
+    the stream itself.
+    """
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    if not isinstance(error, anthropic.APIStatusError):
+        return False
+    if error.status_code >= 500:
+        return True
+    body = error.body if isinstance(error.body, dict) else {}
+    error_info = body.get('error')
+    error_type = error_info.get('type') if isinstance(error_info, dict) else None
+    return error_type in RETRYABLE_STREAM_ERROR_TYPES
+
+
+def log_retry(retry_state: tenacity.RetryCallState):
+    """Report a failed attempt before tenacity sleeps and retries it."""
+    error = retry_state.outcome.exception()
+    print(f"⚠️  Summary attempt {retry_state.attempt_number} failed ({type(error).__name__}), "
+          f"retrying in {retry_state.next_action.sleep:.1f}s...")
+
+
+@functools.lru_cache(maxsize=1)
+def shared_anthropic_http_client() -> DefaultAsyncHttpxClient:
+    """One connection pool for every Anthropic client in the run (summaries and item selection).
+
+    Pooled connections belong to the event loop that opened them, so this
+    assumes a single `asyncio.run`, as in `main.py`.
+    """
+    return DefaultAsyncHttpxClient()
+
+
+def prompt_content(text: str, max_chars: int = SUMMARY_CONTENT_MAX_CHARS) -> str:
+    """Reduce an item's HTML description to plain text of at most `max_chars`, cut at a sentence end if possible."""
+    text = HTML_SKIPPED_ELEMENT_RE.sub(' ', text)
+    text = html.unescape(HTML_TAG_RE.sub(' ', text))
+    text = WHITESPACE_RE.sub(' ', text).strip()
+    if len(text) <= max_chars:
+        return text
+
+    text = text[:max_chars]
+    sentence_ends = [match.end() for match in SENTENCE_END_RE.finditer(text)]
+    # Only back up to a sentence end if that keeps most of the text
+    if sentence_ends and sentence_ends[-1] > max_chars // 2:
+        return text[:sentence_ends[-1]]
+    return text
+
+
+def verbatim_summary(item: FeedItem) -> Optional[str]:
+    """The item's own text if it is already as short as a summary, else None."""
+    text = prompt_content(item.description or item.content or '')
+    if not text or len(text) > SUMMARY_VERBATIM_MAX_CHARS:
+        return None
+    # The last sentence has no whitespace after its full stop
+    if len(SENTENCE_END_RE.findall(text)) >= SUMMARY_VERBATIM_MAX_SENTENCES:
+        return None
+    if len(text.split()) < SUMMARY_VERBATIM_MIN_WORDS or METADATA_DESCRIPTION_RE.search(text):
+        return None
+    return text
+
+
+def near_duplicate_text(item: FeedItem) -> Optional[str]:
+    """The title and opening of an item, embedded to find near-duplicates; None without both."""
+    lede = prompt_content(item.description or item.content or '', NEAR_DUPLICATE_CONTENT_CHARS)
+    if not item.title or not lede:
+        return None
+    return f"{item.title}\n\n{lede}"
+
+
+@functools.lru_cache(maxsize=8)
+def summary_instructions(topics: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    """System prompt shared by every summary in a run, built once per topic list.
+
+    It is not marked for prompt caching: a few hundred tokens is well below
+    Anthropic's minimum cacheable prefix (1024 tokens, more on Haiku), so a
+    breakpoint here would never produce a cache hit.
+    """
+    return [{
+        'type': 'text',
+        'text': f"""You are analyzing RSS feed items.
 
 Topics of interest: {', '.join(topics)}
 
 The first line should identify the first author(s) and the last author. 
 Follow this with a concise summary as 3 bullet points. Keep each bullet point to one concise sentence. Be direct and professional."""
+    }]
+
+
+class ClaudeSummarizer:
+    def __init__(self, api_key: str, summarization_model: str = "claude-haiku-4-5",
+                 cache_dir: str = None,
+                 text_embedding: Callable[[List[str]], Awaitable[List[np.ndarray]]] = None,
+                 similarity_threshold: float = None, requests_per_minute: int = SUMMARY_REQUESTS_PER_MINUTE,
+                 post_short_descriptions: bool = False):
+        self.client = AsyncAnthropic(api_key=api_key, http_client=shared_anthropic_http_client())
+        self.summarization_model = summarization_model
+        self._limiter = AsyncLimiter(requests_per_minute, 60)
+        # Monotonic time before which no new summary request is sent (see `_pace_from_headers`)
+        self._resume_at = 0.0
+        # Summaries of unchanged items are reused across runs (disabled without a cache_dir)
+        self.cache = Cache(cache_dir) if cache_dir else None
+        self.cache_hits = 0
+        # Near-duplicates (e.g. the same story from another feed) reuse a summary when the normalized
+        # embeddings of their title and lede, from `text_embedding`, are at least `similarity_threshold` similar
+        self.text_embedding = text_embedding
+        self.semantic_cache = None
+        if self.cache is not None and text_embedding is not None and similarity_threshold is not None:
+            self.semantic_cache = SemanticSummaryCache(os.path.join(cache_dir, 'near_duplicates'), self.cache,
+                                                       similarity_threshold)
+        self.semantic_hits = 0
+        # Use short abstract-like descriptions as their own summary instead of asking Claude
+        self.post_short_descriptions = post_short_descriptions
+
+    def _get_cache_key(self, item: FeedItem, topics: List[str]) -> str:
+        """Generate cache key for a summary from the model and everything the prompt is built from."""
+        content = item.description or item.content or ''
+        digest = hashlib.sha256("\x00".join([
+            self.summarization_model, item.title, item.feedSource, item.creator or '', content, *sorted(topics)
+        ]).encode('utf-8')).hexdigest()
+        return f"summary:{SUMMARY_CACHE_KEY_VERSION}:{digest}"
+
+    def _build_prompt(self, item: FeedItem) -> str:
+        """The per-item part of the summary prompt."""
+        author_line = f"Author: {item.creator}\n" if item.creator else ""
+
+        return f"""Here are the details of the RSS feed item:
+
+Title: {item.title}
+Source: {item.feedSource}
+{author_line}
+Content:
+{prompt_content(item.description or item.content or '') or 'No content available'}"""
 
-        # Run in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        message = await loop.run_in_executor(
-            None,
-            lambda: self.client.messages.create(
-                model=self.summarization_model,
-                max_tokens=300,
-                messages=[{
-                    'role': 'user',
-                    'content': prompt
-                }]
-            )
-        )
+    def _summary_request(self, item: FeedItem, topics: List[str]) -> Dict[str, Any]:
+        """Messages API parameters for summarizing one item (shared by direct and batch requests)."""
+        return {
+            'model': self.summarization_model,
+            'max_tokens': SUMMARY_MAX_TOKENS,
+            'system': summary_instructions(tuple(topics)),
+            'messages': [{
+                'role': 'user',
+                'content': self._build_prompt(item)
+            }]
+        }
 
+    def _combined_request(self, items: List[FeedItem], topics: List[str]) -> Dict[str, Any]:
+        """Messages API parameters for summarizing several items in one request."""
+        items_block = "\n\n".join(f"### Item {idx}\n{self._build_prompt(item)}" for idx, item in enumerate(items))
+        return {
+            'model': self.summarization_model,
+            'max_tokens': SUMMARY_MAX_TOKENS * len(items),
+            'system': summary_instructions(tuple(topics)),
+            'tools': [RECORD_SUMMARIES_TOOL],
+            'tool_choice': {'type': 'tool', 'name': RECORD_SUMMARIES_TOOL['name']},
+            'messages': [{
+                'role': 'user',
+                'content': f"Summarize each of the {len(items)} RSS feed items below and record every summary "
+                           f"with the {RECORD_SUMMARIES_TOOL['name']} tool.\n\n{items_block}"
+            }]
+        }
+
+    def _message_text(self, message, item: FeedItem) -> str:
+        """Extract the summary text from a response message."""
         # Better error handling for empty content
         if not message.content:
-            print(f"Empty content in API response. Stop reason: {message.stop_reason}.\n{message}\n{item.get('title')}")
+            print(f"Empty content in API response. Stop reason: {message.stop_reason}.\n{message}\n{item.title}")
             if message.stop_reason == 'refusal':
                 return "Claude refused to summarize this one :("
 
         if len(message.content) == 0:
-            print(f"No content blocks returned. Stop reason: {message.stop_reason}.\n{message}\n{item.get('title')}")
+            print(f"No content blocks returned. Stop reason: {message.stop_reason}.\n{message}\n{item.title}")
             if message.stop_reason == 'refusal':
                 return "Claude refused to summarize this one :("
 
+        if message.stop_reason == 'max_tokens':
+            print(f"Summary hit the {SUMMARY_MAX_TOKENS}-token limit and may be cut off: {item.title}")
+
         # Check if first content block has text
         if not hasattr(message.content[0], 'text'):
-            print(f"Content block has no text attribute. Type: {type(message.content[0])}.\n{message}\n{item.get('title')}")
+            print(f"Content block has no text attribute. Type: {type(message.content[0])}.\n{message}\n{item.title}")
 
         return message.content[0].text
 
-    async def summarize_batch(self, items: List[Dict[str, Any]], topics: List[str], max_concurrent: int = 3) -> List[
-        Dict[str, Any]]:
-        """Summarize multiple items in batches."""
-        results = []
+    @tenacity.retry(
+        # Jittered exponential backoff so concurrent summaries don't retry in lockstep
+        wait=tenacity.wait_random_exponential(multiplier=0.5, max=30),
+        stop=tenacity.stop_after_attempt(6),
+        # Only transient failures; bad requests and auth errors won't succeed on retry
+        retry=tenacity.retry_if_exception(is_retryable_error),
+        before_sleep=log_retry,
+        reraise=True,
+    )
+    async def summarize_paper(self, item: FeedItem, topics: List[str]) -> str:
+        """Generate a summary for a single paper/item."""
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        # Stream the response so a cancelled summary stops generating right away
+        async with self.client.messages.stream(**self._summary_request(item, topics)) as stream:
+            self._pace_from_headers(stream.response.headers)
+            message = await stream.get_final_message()
 
-        with tqdm(total=len(items), desc="Summarizing papers", unit="paper") as pbar:
-            for i in range(0, len(items), max_concurrent):
-                batch = items[i:i + max_concurrent]
+        return self._message_text(message, item)
 
-                # Process batch concurrently
-                summaries = await asyncio.gather(
-                    *[self.summarize_paper(item, topics) for item in batch]
-                )
+    def _pace_from_headers(self, headers):
+        """Hold off new requests until the rate limit window resets if Anthropic reports it nearly used up."""
+        remaining = headers.get('anthropic-ratelimit-requests-remaining')
+        reset = headers.get('anthropic-ratelimit-requests-reset')
+        if remaining is None or reset is None:
+            return
+        try:
+            remaining = int(remaining)
+            # The reset time is an RFC 3339 timestamp
+            reset_at = datetime.fromisoformat(reset)
+        except ValueError:
+            # The headers are advisory; never fail a summary over one that doesn't parse
+            return
+        if remaining > SUMMARY_LOW_RATE_LIMIT_REMAINING:
+            return
 
-                # Add summaries to items
-                for item, summary in zip(batch, summaries):
-                    result = item.copy()
-                    result['summary'] = summary
-                    results.append(result)
-                    pbar.update(1)
+        if reset_at.tzinfo is None:
+            reset_at = reset_at.replace(tzinfo=timezone.utc)
+        wait = (reset_at - datetime.now(timezone.utc)).total_seconds()
+        now = time.monotonic()
+        if wait > 0 and now + wait > self._resume_at:
+            if self._resume_at <= now:
+                print(f"⏳ Anthropic rate limit nearly reached, pausing new summaries for {wait:.1f}s")
+            self._resume_at = now + wait
 
-                # Rate limiting: wait between batches
-                if i + max_concurrent < len(items):
-                    await asyncio.sleep(1)
+    @tenacity.retry(
+        wait=tenacity.wait_random_exponential(multiplier=0.5, max=30),
+        stop=tenacity.stop_after_attempt(6),
+        retry=tenacity.retry_if_exception(is_retryable_error),
+        before_sleep=log_retry,
+        reraise=True,
+    )
+    async def summarize_many(self, items: List[FeedItem], topics: List[str]) -> List[Optional[str]]:
+        """Summarize several items with a single request.
 
+        Returns one summary per item, in order; an item the model skipped is None.
+        """
+        message = await self.client.messages.create(**self._combined_request(items, topics))
+        if message.stop_reason == 'max_tokens':
+            print(f"Combined summary of {len(items)} items hit the token limit; missing items will be retried")
+
+        summaries: List[Optional[str]] = [None] * len(items)
+        for block in message.content:
+            if block.type != 'tool_use':
+                continue
+            for entry in block.input.get('summaries', []):
+                idx, summary = entry.get('item'), entry.get('summary')
+                if isinstance(idx, int) and 0 <= idx < len(items) and summary:
+                    summaries[idx] = summary
+        return summaries
+
+    @staticmethod
+    def _dedup_key(item: FeedItem) -> str:
+        """Items with the same canonical link (or, lacking one, the same title) share a summary."""
+        return item.link_canon or item.title
+
+    def _unique_items(self, items: List[FeedItem]) -> Dict[str, FeedItem]:
+        """The first item for each dedup key, in input order."""
+        unique_items: Dict[str, FeedItem] = {}
+        for item in items:
+            unique_items.setdefault(self._dedup_key(item), item)
+        return unique_items
+
+    async def _get_cached_summaries(self, items: Dict[str, FeedItem], topics: List[str]) -> Dict[
+            str, Tuple[Optional[str], Optional[str], Optional[np.ndarray]]]:
+        """Find summaries that need no request: an item's own text if it is short, or a cached one.
+
+        Returns, for each key of `items`, the summary (or None) along with the
+        cache key and near-duplicate embedding to store a fresh summary under.
+        Items the exact cache misses are embedded in one batched call.
+        """
+        results = {}
+        near_duplicate_texts: Dict[str, str] = {}
+        for key, item in items.items():
+            summary = verbatim_summary(item) if self.post_short_descriptions else None
+            if summary is not None:
+                results[key] = (summary, None, None)
+                continue
+
+            cache_key = self._get_cache_key(item, topics) if self.cache is not None else None
+            summary = self.cache.get(cache_key) if cache_key else None
+            if summary is not None:
+                self.cache_hits += 1
+            elif self.semantic_cache is not None and (text := near_duplicate_text(item)) is not None:
+                near_duplicate_texts[key] = text
+            results[key] = (summary, cache_key, None)
+
+        if near_duplicate_texts:
+            vectors = await self.text_embedding(list(near_duplicate_texts.values()))
+            for key, text_vector in zip(near_duplicate_texts, vectors):
+                summary = self.semantic_cache.lookup(text_vector)
+                if summary is not None:
+                    self.semantic_hits += 1
+                results[key] = (summary, results[key][1], text_vector)
         return results
+
+    def _cache_summary(self, summary: str, cache_key: Optional[str], text_vector: Optional[np.ndarray]):
+        """Store a freshly generated summary for later runs."""
+        if cache_key:
+            self.cache.set(cache_key, summary, expire=SUMMARY_CACHE_TTL_SECONDS)
+        if text_vector is not None:
+            self.semantic_cache.add(text_vector, cache_key)
+
+    async def stream_summaries(self, items: List[FeedItem], topics: List[str], max_concurrent: int = 3) -> AsyncIterator[
+        FeedItem]:
+        """Yield items with their summaries in input order as they complete.
+
+        Up to `max_concurrent` requests are in flight, and a new one starts as
+        soon as any finishes; the shared rate limiter paces them. Later items
+        keep summarizing in the background while the caller handles (e.g.
+        posts) the items already yielded.
+        """
+        semaphore = asyncio.Semaphore(max_concurrent)
+
+        async def summarize(item: FeedItem, cached: Tuple) -> str:
+            summary, cache_key, text_vector = cached
+            if summary is not None:
+                return summary
+
+            async with semaphore:
+                async with self._limiter:
+                    summary = await self.summarize_paper(item, topics)
+            self._cache_summary(summary, cache_key, text_vector)
+            return summary
+
+        unique_items = self._unique_items(items)
+        cached = await self._get_cached_summaries(unique_items, topics)
+        # Redraw at most twice a second; the bar writes to stderr from the event loop
+        with tqdm(total=len(unique_items), desc="Summarizing papers", unit="paper", mininterval=0.5) as pbar:
+            tasks = {key: asyncio.create_task(summarize(item, cached[key])) for key, item in unique_items.items()}
+            for task in tasks.values():
+                task.add_done_callback(lambda _: pbar.update(1))
+
+            try:
+                for item in items:
+                    try:
+                        summary = await tasks[self._dedup_key(item)]
+                    except Exception as error:
+                        # Still failing after retries: skip it so it's retried next run
+                        if not is_retryable_error(error):
+                            raise
+                        print(f"⚠️  Skipping \"{item.title}\": summary failed ({error})")
+                        continue
+                    yield replace(item, summary=summary)
+            finally:
+                # On failure or early exit, don't leave summaries running in the background
+                for task in tasks.values():
+                    task.cancel()
+                if self.semantic_cache is not None:
+                    self.semantic_cache.flush()
+
+    async def _batch_api_summaries(self, items: List[FeedItem], topics: List[str]) -> List[Optional[str]]:
+        """Summarize items through the Message Batches API; items that failed in the batch are None."""
+        batch = await self.client.messages.batches.create(requests=[
+            # Custom IDs are positions in `items`; dedup keys are URLs and may be too long
+            {'custom_id': str(idx), 'params': self._summary_request(item, topics)}
+            for idx, item in enumerate(items)
+        ])
+        print(f"Submitted {len(items)} summaries as batch {batch.id}, waiting for results...")
+
+        summaries: List[Optional[str]] = [None] * len(items)
+        try:
+            # Poll with exponential backoff until the batch has ended
+            delay = BATCH_POLL_INITIAL_SECONDS
+            while batch.processing_status != 'ended':
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, BATCH_POLL_MAX_SECONDS)
+                batch = await self.client.messages.batches.retrieve(batch.id)
+
+            async for response in await self.client.messages.batches.results(batch.id):
+                idx = int(response.custom_id)
+                if response.result.type == 'succeeded':
+                    summaries[idx] = self._message_text(response.result.message, items[idx])
+                else:
+                    print(f"Batch summary for \"{items[idx].title}\" {response.result.type}, retrying directly")
+        except Exception as error:
+            if not is_retryable_error(error):
+                raise
+            # Keep the results read so far; the rest are summarized directly
+            print(f"⚠️  Waiting for batch {batch.id} failed ({error}), summarizing the rest directly")
+            if batch.processing_status != 'ended':
+                # Don't pay for batch results that will never be read
+                try:
+                    await self.client.messages.batches.cancel(batch.id)
+                except anthropic.APIError:
+                    pass
+        return summaries
+
+    async def _stream_collected_summaries(
+            self, items: List[FeedItem], topics: List[str],
+            collect: Callable[[List[FeedItem], List[str]], Awaitable[List[Optional[str]]]],
+            max_concurrent: int = 3) -> AsyncIterator[FeedItem]:
+        """Summarize all uncached items at once with `collect` and yield items in input order.
+
+        Items `collect` returns no summary for, or all of them if it fails
+        with a transient error, are retried directly, `max_concurrent` at a time.
+        """
+        summaries: Dict[str, str] = {}
+        pending = {}
+        unique_items = self._unique_items(items)
+        cached = await self._get_cached_summaries(unique_items, topics)
+        for key, (summary, cache_key, text_vector) in cached.items():
+            if summary is not None:
+                summaries[key] = summary
+            else:
+                pending[key] = (cache_key, text_vector)
+
+        if pending:
+            pending_keys = list(pending)
+            try:
+                collected = await collect([unique_items[key] for key in pending_keys], topics)
+            except Exception as error:
+                if not is_retryable_error(error):
+                    raise
+                # Still failing after retries: fall back to summarizing each item directly
+                print(f"⚠️  Summarizing {len(pending_keys)} items together failed ({error}), summarizing each directly")
+                collected = []
+            for key, summary in zip(pending_keys, collected):
+                if summary is not None:
+                    summaries[key] = summary
+
+            semaphore = asyncio.Semaphore(max_concurrent)
+
+            async def summarize_directly(key: str):
+                async with semaphore:
+                    async with self._limiter:
+                        summaries[key] = await self.summarize_paper(unique_items[key], topics)
+
+            retry_keys = [key for key in pending if key not in summaries]
+            results = await asyncio.gather(*[summarize_directly(key) for key in retry_keys], return_exceptions=True)
+            for key, result in zip(retry_keys, results):
+                if isinstance(result, BaseException):
+                    # Still failing after retries: skip it so it's retried next run
+                    if not is_retryable_error(result):
+                        raise result
+                    print(f"⚠️  Skipping \"{unique_items[key].title}\": summary failed ({result})")
+
+            for key, (cache_key, text_vector) in pending.items():
+                if key in summaries:
+                    self._cache_summary(summaries[key], cache_key, text_vector)
+            if self.semantic_cache is not None:
+                self.semantic_cache.flush()
+
+        for item in items:
+            key = self._dedup_key(item)
+            if key in summaries:
+                yield replace(item, summary=summaries[key])
+
+    def stream_batch_summaries(self, items: List[FeedItem], topics: List[str], max_concurrent: int = 3) -> AsyncIterator[
+        FeedItem]:
+        """Summarize through the Message Batches API and yield items in input order.
+
+        Batch requests cost half as much but nothing is yielded until the whole
+        batch has ended, which usually takes minutes. Cached items are not
+        submitted, and requests that fail in the batch are retried directly.
+        """
+        return self._stream_collected_summaries(items, topics, self._batch_api_summaries, max_concurrent)
+
+    def stream_combined_summaries(self, items: List[FeedItem], topics: List[str], max_concurrent: int = 3) -> AsyncIterator[
+        FeedItem]:
+        """Summarize all uncached items in one request and yield items in input order.
+
+        One request replaces one per item, sharing the instructions and the
+        round trip, but nothing is yielded until every summary is written.
+        Items missing from the response are retried directly.
+        """
+        return self._stream_collected_summaries(items, topics, self.summarize_many, max_concurrent)
+
+    async def summarize_batch(self, items: List[FeedItem], topics: List[str], max_concurrent: int = 3) -> List[
+        FeedItem]:
+        """Summarize multiple items in batches."""
+        return [result async for result in self.stream_summaries(items, topics, max_concurrent)]